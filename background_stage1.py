@@ -6,101 +6,486 @@ Stage 1: Background ingestion of SAP / Vault / PowerBI / PO / Invoice
 
 import os
 import sys
+import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import pandas as pd
 
-from config import SOURCES_DIRS, OUTPUT_DIR
-from ingestion_utils import load_file
-from cleansing import cleanup_pipeline
+from config import SOURCES_DIRS, OUTPUT_DIR, INGEST_WORKERS, INGEST_BATCH_ROWS, SNAPSHOT_EXCEL, DEDUP_ENABLED
+import ingestion_cache
+import ingestion_utils
+import near_duplicates
+import ocr_ingestion
+import pipeline_metrics
+import stage1_manifest
+from ingestion_utils import load_file, iter_file_batches
+import cleansing
+from cleansing import cleanup_pipeline_batches, cleanup_pipeline_parallel, to_categoricals
 from enrichment_text import enrich_from_description
-from merge_logic import merge_records_by_part_number
+from merge_logic import merge_frame_by_part_number, merge_record_stream
 from db import init_db, upsert_part_master
+from snapshot_io import export_excel, read_snapshot, write_snapshot
 
 # Force unbuffered output for Render logs
-sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', buffering=1)
-sys.stderr = os.fdopen(sys.stderr.fileno(), 'w', buffering=1)
+sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', buffering=1, closefd=False)
+sys.stderr = os.fdopen(sys.stderr.fileno(), 'w', buffering=1, closefd=False)
 
 
-def load_all_sources() -> pd.DataFrame:
-    all_rows = []
+SourceTask = Tuple[str, str, str]  # (system, fname, path)
+
+
+def _list_source_files() -> List[SourceTask]:
+    """
+    All source files in a stable order: SOURCES_DIRS order, then file name.
+    """
+    tasks = []
     for system, folder in SOURCES_DIRS.items():
         if not os.path.isdir(folder):
             print(f"⚠️  Folder not found: {folder}", flush=True)
             continue
-        for fname in os.listdir(folder):
-            path = os.path.join(folder, fname)
-            print(f"📄 [{system}] Processing: {path}", flush=True)
-            df = load_file(path)
-            if df is None or df.empty:
-                continue
-            df["source_system"] = system
-            df["source_file"] = fname
-            all_rows.append(df)
+        for fname in sorted(os.listdir(folder)):
+            tasks.append((system, fname, os.path.join(folder, fname)))
+    return tasks
+
+
+def _init_ingest_worker(pdf_workers: int, clean_workers: int, ocr_workers: int) -> None:
+    # keep file-level x page/chunk/OCR-level parallelism within the core count
+    ingestion_utils.PDF_WORKERS = pdf_workers
+    cleansing.CLEAN_WORKERS = clean_workers
+    ocr_ingestion.OCR_WORKERS = ocr_workers
+
+
+def _load_source_file(task: SourceTask) -> Optional[pd.DataFrame]:
+    """
+    Load + tag ONE source file. Runs in a worker process when parallel.
+    """
+    system, fname, path = task
+    print(f"📄 [{system}] Processing: {path}", flush=True)
+    df = load_file(path)
+    if df is None or df.empty:
+        return None
+    df["source_system"] = system
+    df["source_file"] = fname
+    return df
+
+
+def _file_keys(tasks: List[SourceTask]) -> Dict[str, str]:
+    """{path: ingestion cache key} - the content identity of every file."""
+    return {path: ingestion_cache.cache_key(path, system) for system, _, path in tasks}
+
+
+def _load_clean_source_file(
+    task: SourceTask, use_cache: bool = True, keys: Optional[Dict[str, str]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Load + tag + clean ONE source file, going through the ingestion cache.
+    Files without rows are cached too, so they aren't re-parsed either.
+    """
+    system, fname, path = task
+    key = None
+    if use_cache:
+        key = (keys or {}).get(path) or ingestion_cache.cache_key(path, system)
+        cached = ingestion_cache.load_cached(key)
+        if cached is not None:
+            print(f"♻️  [{system}] Unchanged, using cache: {path}", flush=True)
+            return None if cached.empty else cached
+
+    df = _load_source_file(task)
+    df = clean_pipeline(df) if df is not None else pd.DataFrame()
+
+    if key is not None:
+        ingestion_cache.store(key, df)
+    return None if df.empty else df
+
+
+def _map_source_files(
+    fn, tasks: List[SourceTask], workers: Optional[int]
+) -> Tuple[List[Optional[pd.DataFrame]], Set[str]]:
+    """
+    Run fn(task) for every task, in a process pool when workers > 1.
+    Returns (results, paths of the files that failed).
+
+    - result i belongs to tasks[i] (None = no rows, or failed)
+    - a file that fails is reported and skipped
+    - a crashed worker (segfault, OOM kill) breaks the whole pool, so the
+      files still unfinished then are retried one per single-worker pool:
+      only the file that crashes again is lost
+    """
+    if workers is None:
+        workers = INGEST_WORKERS
+    workers = max(1, min(workers, len(tasks)))
+
+    results: List[Optional[pd.DataFrame]] = [None] * len(tasks)
+    failed: Set[str] = set()
+
+    if workers == 1:
+        for i, task in enumerate(tasks):
+            try:
+                results[i] = fn(task)
+            except Exception as e:
+                print(f"❌ [{task[0]}] Failed: {task[2]}: {e}", flush=True)
+                failed.add(task[2])
+    else:
+        print(f"⚙️  Parsing {len(tasks)} files with {workers} workers", flush=True)
+        pdf_workers = max(1, ingestion_utils.PDF_WORKERS // workers)
+        clean_workers = max(1, cleansing.CLEAN_WORKERS // workers)
+        ocr_workers = max(1, ocr_ingestion.OCR_WORKERS // workers)
+        pool = partial(
+            ProcessPoolExecutor,
+            initializer=_init_ingest_worker,
+            initargs=(pdf_workers, clean_workers, ocr_workers),
+        )
+        unfinished = []
+        with pool(max_workers=workers) as executor:
+            futures = [executor.submit(fn, task) for task in tasks]
+            for i, (task, fut) in enumerate(zip(tasks, futures)):
+                try:
+                    results[i] = fut.result()
+                except BrokenProcessPool:
+                    unfinished.append(i)
+                except Exception as e:
+                    print(f"❌ [{task[0]}] Failed: {task[2]}: {e}", flush=True)
+                    failed.add(task[2])
+
+        if unfinished:
+            print(f"⚠️  A worker crashed; retrying {len(unfinished)} unfinished files one at a time", flush=True)
+        for i in unfinished:
+            task = tasks[i]
+            with pool(max_workers=1) as executor:
+                try:
+                    results[i] = executor.submit(fn, task).result()
+                except Exception as e:  # BrokenProcessPool: this file crashes its worker
+                    print(f"❌ [{task[0]}] Failed: {task[2]}: {e}", flush=True)
+                    failed.add(task[2])
+
+    return results, failed
+
+
+def load_all_sources(workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load every file under SOURCES_DIRS (raw, uncleaned).
+    workers > 1 parses files in a process pool (default: INGEST_WORKERS).
+    """
+    results, _ = _map_source_files(_load_source_file, _list_source_files(), workers)
+    all_rows = [df for df in results if df is not None]
     if not all_rows:
         return pd.DataFrame()
     return pd.concat(all_rows, ignore_index=True)
 
 
+def _load_clean(
+    tasks: List[SourceTask],
+    workers: Optional[int],
+    use_cache: bool,
+    keys: Optional[Dict[str, str]] = None,
+) -> Tuple[List[Optional[pd.DataFrame]], Set[str]]:
+    """Cleaned frame per task (None = no rows or failed), plus the failed paths."""
+    fn = partial(_load_clean_source_file, use_cache=use_cache, keys=keys)
+    results, failed = _map_source_files(fn, tasks, workers)
+
+    if use_cache:
+        removed = ingestion_cache.evict()
+        if removed:
+            print(f"🧹 Evicted {removed} old cache entries", flush=True)
+    return results, failed
+
+
+def _concat(frames: List[Optional[pd.DataFrame]]) -> pd.DataFrame:
+    frames = [df for df in frames if df is not None]
+    if not frames:
+        return pd.DataFrame()
+    # per-file categories differ, so concat hands back object columns
+    return to_categoricals(pd.concat(frames, ignore_index=True), inplace=True)
+
+
+def load_clean_sources(workers: Optional[int] = None, use_cache: bool = True) -> pd.DataFrame:
+    """
+    load_all_sources() + clean_pipeline(), done per file so each cleaned
+    frame can be cached. Unchanged files are read back from the cache
+    and skip both parsing and cleansing.
+    """
+    return _concat(_load_clean(_list_source_files(), workers, use_cache)[0])
+
+
+def iter_source_batches(batch_rows: int = INGEST_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Streaming counterpart of load_all_sources(): tagged batches of at most
+    batch_rows rows, file by file, in _list_source_files() order.
+    """
+    for system, fname, path in _list_source_files():
+        print(f"📄 [{system}] Streaming: {path}", flush=True)
+        for df in iter_file_batches(path, batch_rows):
+            if df.empty:
+                continue
+            df["source_system"] = system
+            df["source_file"] = fname
+            yield df
+
+
 def clean_pipeline(df: pd.DataFrame) -> pd.DataFrame:
-    df = cleanup_pipeline(df)
-    df = enrich_from_description(df)
-    return df
+    """Cleanse + enrich (chunk-parallel when large); df is handed over."""
+    df = cleanup_pipeline_parallel(df, enrich=True)
+    return to_categoricals(df, inplace=True)
 
 
-def run_stage1():
-    print("=" * 80, flush=True)
-    print("🚀 Stage 1: Background Ingestion Started", flush=True)
-    print("=" * 80, flush=True)
+def clean_batches(batches) -> Iterator[pd.DataFrame]:
+    for df in cleanup_pipeline_batches(batches):
+        yield enrich_from_description(df, inplace=True)
 
-    try:
-        init_db()
-        print("✅ Database initialized", flush=True)
 
-        df_raw = load_all_sources()
-        print(f"📊 Raw rows loaded: {len(df_raw)}", flush=True)
+@pipeline_metrics.timed()
+def _merge_stream(batch_rows: int) -> Tuple[int, List[dict]]:
+    """
+    Load -> clean -> group/merge without ever holding the full raw frame.
+    Returns (raw row count, merged records).
+    """
+    raw_rows = 0
 
-        if df_raw.empty:
-            print("⚠️  No data loaded from sources - folders may be empty", flush=True)
-            print("✅ Stage 1 complete (no data to process)", flush=True)
-            return
+    def _records():
+        nonlocal raw_rows
+        for df in clean_batches(iter_source_batches(batch_rows)):
+            raw_rows += len(df)
+            yield from df.to_dict(orient="records")
 
-        df_clean = clean_pipeline(df_raw)
-        print(f"✅ Cleaned {len(df_clean)} rows", flush=True)
+    merged_records = merge_record_stream(_records())
+    return raw_rows, merged_records
 
-        # Convert to records
-        records = df_clean.to_dict(orient="records")
 
-        # Group by part number
-        grouped = {}
-        for r in records:
-            pn = r.get("part_number")
-            if not pn:
-                continue
-            grouped.setdefault(pn, []).append(r)
+@pipeline_metrics.timed()
+def _merge_frame(df_clean: pd.DataFrame) -> List[dict]:
+    """Group a cleaned frame by part_number and merge each group (column-wise)."""
+    merged_records = merge_frame_by_part_number(df_clean)
+    print(f"📊 Grouped into {len(merged_records)} unique part numbers", flush=True)
+    return merged_records
+
+
+def _manifest_entries(
+    tasks: List[SourceTask],
+    keys: Dict[str, str],
+    df_clean: pd.DataFrame,
+    failed: Set[str] = frozenset(),
+    old: Optional[Dict[str, Dict]] = None,
+) -> Dict[str, Dict]:
+    """
+    Manifest entries for tasks. A file that failed to load gets no key, so
+    the next incremental run retries it, and keeps the part_numbers it had
+    (those are re-merged then too).
+    """
+    pns = stage1_manifest.part_numbers_by_file(df_clean)
+    entries = {}
+    for system, fname, path in tasks:
+        fid = stage1_manifest.file_id(system, fname)
+        if path in failed:
+            entries[fid] = {"key": None, "part_numbers": (old or {}).get(fid, {}).get("part_numbers", [])}
+        else:
+            entries[fid] = {"key": keys[path], "part_numbers": pns.get(fid, [])}
+    return entries
+
+
+def _merge_in_memory(
+    workers: Optional[int], use_cache: bool = True
+) -> Optional[Tuple[List[dict], Dict[str, Dict]]]:
+    """
+    Classic path: load + clean every file, group, merge.
+    Returns (merged records, new manifest), or None when no source rows
+    were found.
+    """
+    tasks = _list_source_files()
+    keys = _file_keys(tasks)
+    with pipeline_metrics.stage("load_clean") as st:
+        frames, failed = _load_clean(tasks, workers, use_cache, keys)
+        df_clean = st.frame(_concat(frames))
+    print(f"📊 Cleaned rows loaded: {len(df_clean)}", flush=True)
+
+    if df_clean.empty:
+        print("⚠️  No data loaded from sources - folders may be empty", flush=True)
+        return None
+
+    return _merge_frame(df_clean), _manifest_entries(tasks, keys, df_clean, failed)
+
+
+def _merge_incremental(
+    workers: Optional[int], use_cache: bool = True
+) -> Tuple[List[dict], Set[str], Dict[str, Dict]]:
+    """
+    Re-merge only the part_numbers touched by new, changed or removed
+    files since the last run (per output/stage1_manifest.json).
+
+    Rows for those parts are still taken from EVERY file that has them
+    (unchanged files come straight from the ingestion cache), in the usual
+    file order, so a re-merged part is identical to a full run.
+
+    Returns (merged records, affected part_numbers, new manifest).
+    """
+    tasks = _list_source_files()
+    keys = _file_keys(tasks)
+    old = stage1_manifest.load_manifest()
+
+    fids = [stage1_manifest.file_id(system, fname) for system, fname, _ in tasks]
+    changed = [
+        i for i, (fid, (_, _, path)) in enumerate(zip(fids, tasks))
+        if old.get(fid, {}).get("key") != keys[path]
+    ]
+    removed = sorted(set(old) - set(fids))
+    print(
+        f"🔎 Incremental: {len(changed)} new/changed, {len(removed)} removed, "
+        f"{len(tasks) - len(changed)} unchanged files",
+        flush=True,
+    )
+
+    manifest = {fid: old[fid] for fid in fids if fid in old}
+    if not changed and not removed:
+        return [], set(), manifest
+
+    # parts the changed / removed files contributed last time ...
+    affected: Set[str] = set()
+    for fid in [fids[i] for i in changed] + removed:
+        affected.update(old.get(fid, {}).get("part_numbers", []))
+
+    # ... plus whatever the changed files contribute now
+    frames: List[Optional[pd.DataFrame]] = [None] * len(tasks)
+    changed_tasks = [tasks[i] for i in changed]
+    changed_frames, failed = _load_clean(changed_tasks, workers, use_cache, keys)
+    for i, df in zip(changed, changed_frames):
+        frames[i] = df
+    new_entries = _manifest_entries(changed_tasks, keys, _concat(changed_frames), failed, old)
+    manifest.update(new_entries)
+    for entry in new_entries.values():
+        affected.update(entry["part_numbers"])
+
+    # unchanged files that also hold rows for an affected part
+    changed_set = set(changed)
+    others = [
+        i for i, fid in enumerate(fids)
+        if i not in changed_set
+        and not affected.isdisjoint(old.get(fid, {}).get("part_numbers", []))
+    ]
+    other_tasks = [tasks[i] for i in others]
+    other_frames, other_failed = _load_clean(other_tasks, workers, use_cache, keys)
+    for i, df in zip(others, other_frames):
+        frames[i] = df
+    # an unchanged file that failed now left its rows out of the re-merged
+    # parts: drop its key so the next run retries it
+    for i in others:
+        if tasks[i][2] in other_failed:
+            manifest[fids[i]] = {**manifest[fids[i]], "key": None}
+
+    df_clean = _concat(frames)
+    if not df_clean.empty:
+        df_clean = df_clean[df_clean["part_number"].isin(affected)]
+    print(f"📊 Affected part_numbers: {len(affected)} ({len(df_clean)} rows)", flush=True)
 
-        print(f"📊 Grouped into {len(grouped)} unique part numbers", flush=True)
+    merged_records = _merge_frame(df_clean) if not df_clean.empty else []
+    orphaned = len(affected) - len(merged_records)
+    if orphaned:
+        print(f"⚠️  {orphaned} part_numbers no longer in any source (left untouched in DB)", flush=True)
 
-        # Merge rows for each part
-        merged_records = []
-        for pn, rows in grouped.items():
-            merged = merge_records_by_part_number(rows)
-            merged_records.append(merged)
+    return merged_records, affected, manifest
+
+
+@pipeline_metrics.timed()
+def _write_snapshot(
+    merged_records: List[dict],
+    replace_parts: Optional[Set[str]] = None,
+    excel: bool = False,
+) -> str:
+    """
+    Write the Stage 1 snapshot (Parquet, + .xlsx when excel). With
+    replace_parts, only those parts are replaced in the previous snapshot
+    (incremental runs).
+    """
+    snapshot_path = os.path.join(OUTPUT_DIR, "stage1_master_snapshot.parquet")
+    df = pd.DataFrame(merged_records)
+
+    if replace_parts is not None and os.path.exists(snapshot_path):
+        previous = read_snapshot(snapshot_path)
+        if "part_number" in previous.columns:
+            previous = previous[~previous["part_number"].astype(str).isin(replace_parts)]
+        df = pd.concat([previous, df], ignore_index=True)
+
+    write_snapshot(df, snapshot_path)
+    if excel:
+        excel_path = os.path.splitext(snapshot_path)[0] + ".xlsx"
+        export_excel(df, excel_path, autofit=False)
+        print(f"📂 Excel export saved to: {excel_path}", flush=True)
+    return snapshot_path
+
+
+@pipeline_metrics.timed("near_duplicates")
+def _update_near_duplicates(merged_records: List[dict], replace_all: bool) -> None:
+    """Candidate duplicate clusters are a by-product: failures only warn."""
+    fields = ["part_number", "description", "material", "dimensions"]
+    try:
+        near_duplicates.update_index(pd.DataFrame.from_records(merged_records, columns=fields), replace_all)
+    except Exception as e:
+        print(f"⚠️  Near-duplicate detection skipped: {e}", flush=True)
+
+
+@pipeline_metrics.run("stage1")
+def run_stage1(
+    workers: Optional[int] = None,
+    stream: bool = False,
+    batch_rows: int = INGEST_BATCH_ROWS,
+    use_cache: bool = True,
+    incremental: bool = False,
+    excel: bool = SNAPSHOT_EXCEL,
+):
+    print("=" * 80, flush=True)
+    print("🚀 Stage 1: Background Ingestion Started", flush=True)
+    print("=" * 80, flush=True)
+
+    try:
+        init_db()
+        print("✅ Database initialized", flush=True)
+
+        manifest = None
+        replace_parts = None  # incremental: parts to swap in the snapshot
+        if stream:
+            raw_rows, merged_records = _merge_stream(batch_rows)
+            print(f"📊 Rows streamed (batches of {batch_rows}): {raw_rows}", flush=True)
+            if not raw_rows:
+                print("⚠️  No data loaded from sources - folders may be empty", flush=True)
+                print("✅ Stage 1 complete (no data to process)", flush=True)
+                return
+        elif incremental:
+            merged_records, affected, manifest = _merge_incremental(workers, use_cache=use_cache)
+            if not affected:
+                stage1_manifest.save_manifest(manifest)
+                print("✅ Stage 1 complete (no source changes)", flush=True)
+                return
+            # orphaned parts stay in the DB, so they stay in the snapshot too
+            replace_parts = {r["part_number"] for r in merged_records}
+        else:
+            result = _merge_in_memory(workers, use_cache=use_cache)
+            if result is None:
+                print("✅ Stage 1 complete (no data to process)", flush=True)
+                return
+            merged_records, manifest = result
 
         print(f"📊 Unique merged part_numbers: {len(merged_records)}", flush=True)
 
         # Upsert
         if merged_records:
-            upsert_part_master(merged_records)
+            with pipeline_metrics.stage("upsert") as st:
+                upsert_part_master(st.count(merged_records))
             print(f"✅ Upserted {len(merged_records)} records to database", flush=True)
         else:
             print("⚠️  No records to upsert", flush=True)
 
+        # Only now does the DB reflect these files
+        if manifest is not None:
+            stage1_manifest.save_manifest(manifest)
+
         # Save snapshot for inspection
-        snapshot_path = os.path.join(OUTPUT_DIR, "stage1_master_snapshot.xlsx")
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        pd.DataFrame(merged_records).to_excel(snapshot_path, index=False)
+        snapshot_path = _write_snapshot(merged_records, replace_parts=replace_parts, excel=excel)
         print(f"📂 Snapshot saved to: {snapshot_path}", flush=True)
+
+        if DEDUP_ENABLED:
+            _update_near_duplicates(merged_records, replace_all=replace_parts is None)
         print("=" * 80, flush=True)
         print("✅ Stage 1 complete successfully!", flush=True)
         print("=" * 80, flush=True)
@@ -115,4 +500,47 @@ def run_stage1():
 
 
 if __name__ == "__main__":
-    run_stage1()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Stage 1 background ingestion")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=f"processes used to parse source files (default: {INGEST_WORKERS})",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--stream",
+        action="store_true",
+        help="bounded-memory mode: read, clean and merge sources batch by batch",
+    )
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="re-merge and upsert only part_numbers from new/changed/removed files",
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=INGEST_BATCH_ROWS,
+        help=f"rows per batch in --stream mode (default: {INGEST_BATCH_ROWS})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-parse and re-clean every file, ignoring the ingestion cache",
+    )
+    parser.add_argument(
+        "--excel",
+        action="store_true",
+        default=SNAPSHOT_EXCEL,
+        help="also export the Parquet snapshot to .xlsx",
+    )
+    args = parser.parse_args()
+    run_stage1(
+        workers=args.workers,
+        stream=args.stream,
+        batch_rows=args.batch_rows,
+        use_cache=not args.no_cache,
+        incremental=args.incremental,
+        excel=args.excel,
+    )
@@ -0,0 +1,80 @@
+# benchmarks/bench_basic_cleaning.py
+"""
+Vectorized cleansing.basic_cleaning vs the original per-cell apply.
+
+Run from the repo root:
+    python -m benchmarks.bench_basic_cleaning [--rows N] [--repeat N]
+
+Builds a synthetic frame shaped like merged source data (padded strings,
+null spellings, sparse text columns, floats with NaN, ints, datetimes),
+checks both implementations give identical frames and prints best-of-N
+timings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleansing import _clean_str, basic_cleaning
+
+
+def legacy_basic_cleaning(df: pd.DataFrame) -> pd.DataFrame:
+    """The original implementation: one Python call per cell."""
+    df = df.copy()
+    for col in df.columns:
+        df[col] = df[col].apply(_clean_str)
+    return df
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array(["bolt", " nut ", "Washer", "  ", "", "nan", "None", "NULL", "bracket 20x30 mm", "N/A"])
+    cost = rng.normal(100, 30, rows).round(2)
+    cost[rng.random(rows) < 0.2] = np.nan
+
+    df = pd.DataFrame({
+        "part_number": [f"P{i:07d}" for i in range(rows)],
+        "description": words[rng.integers(0, len(words), rows)],
+        "vendor_name": np.where(rng.random(rows) < 0.7, None, " Acme Corp "),
+        "cost": cost,
+        "stock_qty": rng.integers(0, 5000, rows),
+        "created": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 1000, rows), unit="D"),
+    })
+    # mixed object column, as produced by concatenating sources
+    mixed = df["cost"].astype(object)
+    mixed[::3] = " 12 "
+    mixed[1::7] = 7
+    df["plant"] = mixed
+    return df
+
+
+def _best(fn, df, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    print(f"rows={len(df):,} cols={len(df.columns)}")
+
+    t_old, old = _best(legacy_basic_cleaning, df, args.repeat)
+    t_new, new = _best(basic_cleaning, df, args.repeat)
+    pd.testing.assert_frame_equal(old, new)
+
+    print(f"apply      {t_old:8.3f}s")
+    print(f"vectorized {t_new:8.3f}s  ({t_old / t_new:.1f}x)  parity OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_category_classifier.py
+"""
+Throughput and hold-out accuracy of category_classifier.CentroidModel.
+
+Run from the repo root:
+    python -m benchmarks.bench_category_classifier [--train N] [--rows N] [--repeat N]
+
+Trains on synthetic "<material> <part type> <size>" descriptions labelled
+by part type (with some typo noise), then scores --rows unseen ones in a
+single predict() call and prints descriptions per second (one core).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from category_classifier import CentroidModel
+
+PARTS = {
+    "Bearing": ["roller bearing", "ball bearing", "needle bearing", "thrust bearing"],
+    "Fastener": ["hex nut", "washer", "socket screw", "rivet", "stud bolt"],
+    "Motor": ["dc motor", "stepper motor", "servo motor", "gear motor"],
+    "Sensor": ["pressure sensor", "proximity switch", "temperature probe", "encoder"],
+    "Pipe Fitting": ["elbow", "coupler", "reducer tee", "flange adaptor"],
+    "Electrical": ["relay", "connector", "terminal block", "contactor"],
+}
+MATERIALS = ["steel", "ss304", "ss316", "brass", "copper", "aluminum", "nylon", "cast iron"]
+
+
+def synthetic(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(list(PARTS), n)
+    texts = []
+    for label in labels:
+        part = str(rng.choice(PARTS[label]))
+        if rng.random() < 0.2:  # typo
+            i = rng.integers(len(part))
+            part = part[:i] + part[i + 1:]
+        size = f"{rng.integers(1, 99)}x{rng.integers(1, 999)} mm"
+        texts.append(f"{rng.choice(MATERIALS).title()} {part.title()} {size}")
+    return texts, labels.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--train", type=int, default=5_000)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    train_texts, train_labels = synthetic(args.train, 0)
+    texts, labels = synthetic(args.rows, 1)
+
+    t0 = time.perf_counter()
+    model = CentroidModel.fit(train_texts, train_labels)
+    t_fit = time.perf_counter() - t0
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        pred, _ = model.predict(texts, min_score=0.0)
+        best = min(best, time.perf_counter() - t0)
+    acc = np.mean(np.array(pred, dtype=object) == np.array(labels, dtype=object))
+
+    print(f"train={args.train:,} ({t_fit:.2f}s)  rows={args.rows:,}  classes={len(model.classes)}")
+    print(f"predict {best:8.3f}s  {args.rows / best:,.0f} descriptions/s  accuracy {acc:.1%}")
+
+
+if __name__ == "__main__":
+    main()
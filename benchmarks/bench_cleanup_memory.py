@@ -0,0 +1,86 @@
+# benchmarks/bench_cleanup_memory.py
+"""
+Peak memory of cleanup_pipeline + enrich_from_description, copying vs
+in-place (the frame handed over to the pipeline).
+
+Run from the repo root:
+    python -m benchmarks.bench_cleanup_memory [--rows N] [--cols N]
+
+Sizes are measured with tracemalloc (numpy buffers and Python strings are
+both traced) on a synthetic wide source frame; the input size is what
+building that frame retained. The ~2x-input limit on the in-place peak
+is enforced by tests/test_cleanup_memory.py.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from cleansing import cleanup_pipeline
+from enrichment_text import enrich_from_description
+
+
+def synthetic_source(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Raw frame as ingestion builds it: sparse text columns, a few synonym groups."""
+    rng = np.random.default_rng(seed)
+    words = np.array(["steel bracket 20x30 mm", "nylon roller", " valve ", "Washer", "bolt M8"])
+    data = {
+        "Part No": [f"P{i:07d}" for i in range(rows)],
+        "Material Code": np.where(rng.random(rows) < 0.5, None, "M-1"),
+        "Description": words[rng.integers(0, len(words), rows)],
+        "Vendor": np.where(rng.random(rows) < 0.3, None, "Acme"),
+        "Unit Price": rng.normal(100, 30, rows).round(2).astype(str),
+    }
+    values = np.array(["A", "B", "C", " D ", "null"], dtype=object)
+    for j in range(cols - len(data)):
+        col = values[rng.integers(0, len(values), rows)]
+        col[rng.random(rows) < 0.8] = np.nan
+        data[f"sap_attr_{j}"] = col
+    return pd.DataFrame(data)
+
+
+def _peak(fn, df):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    out = fn(df)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak, elapsed, out
+
+
+def _copying(df):
+    return enrich_from_description(cleanup_pipeline(df))
+
+
+def _inplace(df):
+    return enrich_from_description(cleanup_pipeline(df, inplace=True), inplace=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=60)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    df = synthetic_source(args.rows, args.cols)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"input: {len(df):,} x {len(df.columns)}, {size / 2**20:.1f} MB")
+
+    peak_copy, t_copy, out_copy = _peak(_copying, df)
+    del out_copy
+    peak_inplace, t_inplace, _ = _peak(_inplace, df.copy())
+
+    print(f"copying  peak {peak_copy / 2**20:8.1f} MB ({peak_copy / size:.2f}x)  {t_copy:6.2f}s")
+    print(f"in-place peak {peak_inplace / 2**20:8.1f} MB ({peak_inplace / size:.2f}x)  {t_inplace:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/bench_enrichment.py
+"""
+enrich_from_description (compiled keyword matcher, one inference per
+distinct description) vs the original per-row linear keyword scan.
+
+Run from the repo root:
+    python -m benchmarks.bench_enrichment [--rows N] [--distinct N] [--keywords N] [--repeat N]
+
+--distinct sets how many different descriptions the rows share (default
+rows / 5: each part described once per source system).
+
+--keywords pads both keyword tables with N synthetic terms (appended
+after the real ones, so the real ones keep priority) to show how both
+implementations scale with dictionary size. Checks both give identical
+frames and prints best-of-N timings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import enrichment_text
+import vocabulary
+from enrichment_text import KeywordMatcher, enrich_from_description
+
+
+def _legacy_first(text, table):
+    low = text.lower()
+    for k, v in table.items():
+        if k in low:
+            return v
+    return None
+
+
+def legacy_enrich(df: pd.DataFrame, materials, categories) -> pd.DataFrame:
+    """The original implementation: one linear keyword scan per row."""
+    df = df.copy()
+    cols = ["material", "category_raw", "category_master"]
+    out = []
+    for desc, material, cat_raw, cat_master in zip(df["description"], *(df[c] for c in cols)):
+        desc = str(desc or "").strip()
+        if desc:
+            if not material:
+                material = _legacy_first(desc, materials) or material
+            if not cat_raw:
+                cat = _legacy_first(desc, categories)
+                if cat:
+                    cat_raw = cat_master = cat
+            elif not cat_master:
+                cat_master = cat_raw
+        out.append((material, cat_raw, cat_master))
+    for c, values in zip(cols, zip(*out)):
+        df[c] = pd.Series(values, index=df.index, dtype=object)
+    return df
+
+
+def padded(table, n, seed):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    out = dict(table)
+    while len(out) < len(table) + n:
+        word = "".join(rng.choice(letters, rng.integers(5, 12)))
+        out.setdefault(word, word.title())
+    return out
+
+
+def synthetic_frame(rows: int, distinct: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    descs = np.array([
+        "Stainless steel bracket 20x30 mm", "NYLON ROLLER 40", "ball bearing 6204",
+        "solenoid valve, brass body", "hex screw m8", "", None, "misc part",
+        "aluminium clamp", "motor mount rubber", "copper busbar",
+    ], dtype=object)
+    desc = descs[rng.integers(0, len(descs), distinct)]
+    desc = [f"{d} {i}" if d else d for i, d in enumerate(desc)]
+    pick = lambda values, p: np.where(rng.random(rows) < p, None, values[rng.integers(0, len(values), rows)])
+    return pd.DataFrame({
+        "part_number": [f"P{i:07d}" for i in range(rows)],
+        "description": np.array(desc, dtype=object)[rng.integers(0, distinct, rows)],
+        "material": pick(np.array(["Steel", ""], dtype=object), 0.7),
+        "category_raw": pick(np.array(["Valve", "Fastener"], dtype=object), 0.6),
+        "category_master": pick(np.array(["Valves"], dtype=object), 0.8),
+    })
+
+
+def _best(fn, df, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--distinct", type=int, default=None)
+    parser.add_argument("--keywords", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    materials = padded(vocabulary.table("materials"), args.keywords, 1)
+    categories = padded(vocabulary.table("categories"), args.keywords, 2)
+    material_matcher, category_matcher = KeywordMatcher(materials), KeywordMatcher(categories)
+    enrichment_text.material_matcher = lambda: material_matcher
+    enrichment_text.category_matcher = lambda: category_matcher
+    enrichment_text.CLASSIFIER_ENABLED = False  # the legacy code has no classifier
+
+    df = synthetic_frame(args.rows, args.distinct or max(1, args.rows // 5))
+    print(f"rows={len(df):,} distinct={df['description'].nunique():,} keywords={len(materials)}+{len(categories)}")
+
+    t_old, old = _best(lambda d: legacy_enrich(d, materials, categories), df, args.repeat)
+    t_new, new = _best(enrich_from_description, df, args.repeat)
+    pd.testing.assert_frame_equal(old, new)
+
+    print(f"linear scan {t_old:8.3f}s")
+    print(f"compiled    {t_new:8.3f}s  ({t_old / t_new:.1f}x)  parity OK")
+
+
+if __name__ == "__main__":
+    main()
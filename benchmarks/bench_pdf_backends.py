@@ -0,0 +1,75 @@
+# benchmarks/bench_pdf_backends.py
+"""
+Compare the pdfplumber and PyMuPDF table backends on the Stage 1 PDFs
+(sources/invoices + sources/pos).
+
+Run from the repo root:
+    python -m benchmarks.bench_pdf_backends [--repeat N] [--workers N]
+
+For every PDF it prints the best-of-N wall time per backend and checks that
+both backends produced the same rows once column names are normalised the
+way cleansing does it.
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from config import SOURCES_DIRS
+from cleansing import _normalize_name
+from ingestion_utils import PDF_BACKENDS, load_pdf_tables
+
+
+def _pdf_paths():
+    for system in ("invoices", "pos"):
+        folder = SOURCES_DIRS[system]
+        if not os.path.isdir(folder):
+            continue
+        for fname in sorted(os.listdir(folder)):
+            if fname.lower().endswith(".pdf"):
+                yield os.path.join(folder, fname)
+
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns=_normalize_name)
+    return df.reindex(sorted(df.columns), axis=1).astype(str).reset_index(drop=True)
+
+
+def _time_backend(path: str, backend: str, repeat: int, workers: int):
+    best = float("inf")
+    df = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = load_pdf_tables(path, backend=backend, workers=workers)
+        best = min(best, time.perf_counter() - t0)
+    return best, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    backends = list(PDF_BACKENDS)
+    print(f"{'file':40s} " + " ".join(f"{b:>12s}" for b in backends) + "  rows  parity")
+
+    for path in _pdf_paths():
+        timings, frames = [], []
+        for backend in backends:
+            t, df = _time_backend(path, backend, args.repeat, args.workers)
+            timings.append(t)
+            frames.append(_comparable(df))
+
+        parity = all(f.equals(frames[0]) for f in frames[1:])
+        print(
+            f"{os.path.basename(path):40s} "
+            + " ".join(f"{t * 1000:10.1f}ms" for t in timings)
+            + f"  {len(frames[0]):4d}  {'OK' if parity else 'DIFF'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_stage1_merge.py
+"""
+Stage 1 merge: merge_frame_by_part_number vs the original
+to_dict + group + merge_records_by_part_number per part.
+
+Run from the repo root:
+    python -m benchmarks.bench_stage1_merge [--rows N] [--parts N] [--columns N] [--repeat N]
+
+The synthetic frame looks like a concatenated cleaned Stage 1 frame:
+categorical source_system / source_file / material, object columns with
+None, NaN (from concat) and blank-like strings, a float cost column.
+Checks both give identical records (values, key order, sources JSON)
+with plain "last row wins" survivorship, that the frame merge agrees
+with the row-by-row fold (merge_record_stream) under the configured
+rules and under every rule kind, and prints best-of-N timings.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from merge_logic import merge_frame_by_part_number, merge_record_stream, merge_records_by_part_number
+from survivorship import LAST_WINS, PLAN, compile_rules
+
+# one field per rule kind, on the synthetic columns
+ALL_RULES = compile_rules({
+    "material": {"rule": "priority", "sources": ["vault", "sap"]},
+    "cost": {"rule": "most_recent", "by": "last_modified"},
+    "field_00": {"rule": "most_frequent"},
+    "field_01": {"rule": "longest"},
+    "field_02": {"rule": "priority"},
+})
+
+
+def legacy_merge(df: pd.DataFrame):
+    """The original background_stage1._merge_frame."""
+    grouped = {}
+    for r in df.to_dict(orient="records"):
+        pn = r.get("part_number")
+        if not pn:
+            continue
+        grouped.setdefault(pn, []).append(r)
+    return [merge_records_by_part_number(rows, LAST_WINS) for rows in grouped.values()]
+
+
+def synthetic_frame(rows: int, parts: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    systems = np.array(["sap", "vault", "powerbi", "pos", "invoices"])
+    system = systems[rng.integers(0, len(systems), rows)]
+    text = np.array(["Steel", "bracket 20x30", "NULL", " ", "Acme", "x", None, np.nan], dtype=object)
+    pns = np.array([f"P{i:07d}" for i in range(parts)] + ["", None], dtype=object)
+    df = pd.DataFrame({
+        "part_number": pns[rng.integers(0, len(pns), rows)],
+        "source_system": pd.Categorical(system),
+        "source_file": pd.Categorical(np.char.add(system, "_export.xlsx")),
+        "material": pd.Categorical(np.where(rng.random(rows) < 0.5, None, "Steel")),
+        "cost": np.where(rng.random(rows) < 0.6, np.nan, rng.integers(1, 900, rows) / 8),
+        "last_modified": np.array(["2024-03-01", "2023-12-31 08:00", "01/02/2024", "", None], dtype=object)[
+            rng.integers(0, 5, rows)
+        ],
+    })
+    for j in range(columns - df.shape[1]):
+        # each source system only carries some columns (NaN elsewhere, as after concat)
+        values = text[rng.integers(0, len(text), rows)]
+        values[system == systems[j % len(systems)]] = np.nan
+        df[f"field_{j:02d}"] = values
+    return df
+
+
+def _best(fn, df, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--parts", type=int, default=250_000)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows, args.parts, args.columns)
+    print(f"rows={len(df):,} parts={df['part_number'].nunique():,} columns={df.shape[1]}")
+
+    t_old, old = _best(legacy_merge, df, args.repeat)
+    t_new, new = _best(lambda d: merge_frame_by_part_number(d, LAST_WINS), df, args.repeat)
+    _check(new, old, "last-wins frame merge vs legacy")
+    t_plan, planned = _best(merge_frame_by_part_number, df, args.repeat)
+    _check(planned, merge_record_stream(df.to_dict("records"), PLAN), "configured rules")
+    t_all, every = _best(lambda d: merge_frame_by_part_number(d, ALL_RULES), df, args.repeat)
+    _check(every, merge_record_stream(df.to_dict("records"), ALL_RULES), "every rule kind")
+
+    print(f"per-part merge               {t_old:8.3f}s")
+    print(f"frame merge, last wins       {t_new:8.3f}s  ({t_old / t_new:.1f}x)")
+    print(f"frame merge, configured      {t_plan:8.3f}s  ({t_old / t_plan:.1f}x)")
+    print(f"frame merge, every rule kind {t_all:8.3f}s  ({t_old / t_all:.1f}x)  parity OK")
+
+
+def _check(new, old, what):
+    assert new == old, f"{what}: merged records differ"
+    assert all(list(a) == list(b) for a, b in zip(old, new)), f"{what}: key order differs"
+
+
+if __name__ == "__main__":
+    main()
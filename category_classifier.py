@@ -0,0 +1,237 @@
+# category_classifier.py
+"""
+Batch category classifier for parts the keyword rules can't categorize.
+
+- features: character 3/4/5-grams of the lower-cased description (digits
+            folded to "0", so sizes don't split classes), hashed into
+            N_FEATURES columns of a scipy sparse matrix; sublinear TF x
+            IDF, rows L2-normalized
+- model:    nearest centroid, i.e. one normalized mean vector per
+            category_master; a text's score for a class is the cosine
+            similarity with its centroid
+- training: part_master rows with a category_raw and category_master
+            (rows categorized only by this classifier have no category_raw,
+            so it never trains on its own output)
+
+N-gram hashing is vectorized over the whole batch (one codepoint array,
+rolling hashes with numpy), so predict() scores a DataFrame column in one
+call. The fitted model is a single .npz at CLASSIFIER_MODEL_PATH, written
+by
+
+    python category_classifier.py [--holdout 0.2]
+
+and loaded lazily (re-read when the file changes).
+"""
+
+import argparse
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from config import CLASSIFIER_MIN_SCORE, CLASSIFIER_MODEL_PATH
+
+# Bump when feature extraction changes (old model files are then ignored).
+MODEL_VERSION = "1"
+
+NGRAMS = (3, 4, 5)
+N_BITS = 18
+N_FEATURES = 1 << N_BITS
+
+_SEP = 0  # "\x00" between texts; no n-gram spans it
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_DIGITS = str.maketrans("123456789", "000000000")
+
+
+# ---------------------------------------------------
+# Features
+# ---------------------------------------------------
+def _hash_ngrams(texts: Sequence[str]) -> sp.csr_matrix:
+    """Raw n-gram counts: (len(texts), N_FEATURES) CSR matrix."""
+    n = len(texts)
+    # lower() per text: it can change a text's length ("İ" -> "i̇")
+    padded = [f" {t} ".lower().translate(_DIGITS) for t in texts]
+    joined = "\x00".join(padded) + "\x00"
+    cps = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+    doc = np.repeat(np.arange(n, dtype=np.int32), [len(p) + 1 for p in padded])
+    text = cps != _SEP
+
+    # grow every position's hash / "no separator inside" flag one
+    # character at a time, emitting the sizes in NGRAMS on the way
+    rows, cols = [], []
+    h = cps.astype(np.uint64)
+    valid = text
+    for size in range(2, max(NGRAMS) + 1):
+        m = len(cps) - size + 1
+        if m <= 0:
+            break
+        h = h[:m] * np.uint64(1_000_003) + cps[size - 1:]  # wraps mod 2**64
+        valid = valid[:m] & text[size - 1:]
+        if size in NGRAMS:
+            feature = ((h[valid] ^ np.uint64(size)) * _MIX) >> np.uint64(64 - N_BITS)
+            rows.append(doc[:m][valid])
+            cols.append(feature.astype(np.int32))
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int32)
+    data = np.ones(len(rows), dtype=np.float32)
+    return sp.csr_matrix((data, (rows, cols)), shape=(n, N_FEATURES))  # sums duplicates
+
+
+def _normalize_rows(x: sp.csr_matrix) -> sp.csr_matrix:
+    per_row = np.diff(x.indptr)
+    row_of = np.repeat(np.arange(x.shape[0]), per_row)
+    norms = np.sqrt(np.bincount(row_of, weights=x.data ** 2, minlength=x.shape[0]))
+    norms[norms == 0] = 1
+    x.data /= norms[row_of].astype(x.data.dtype)
+    return x
+
+
+def _tfidf(counts: sp.csr_matrix, idf: np.ndarray) -> sp.csr_matrix:
+    """Sublinear TF x IDF, L2-normalized; overwrites counts."""
+    x = counts
+    np.log(x.data, out=x.data)
+    x.data += 1
+    x.data *= idf[x.indices]
+    return _normalize_rows(x)
+
+
+# ---------------------------------------------------
+# Model
+# ---------------------------------------------------
+class CentroidModel:
+    def __init__(self, classes: np.ndarray, idf: np.ndarray, centroids: sp.csr_matrix):
+        self.classes = classes
+        self.idf = idf
+        self.centroids = centroids
+        # scoring uses a dense (features used by any centroid + 1, classes)
+        # matrix; every other feature maps to the trailing all-zero row
+        used = np.unique(centroids.indices)
+        self._column = np.full(N_FEATURES, len(used), dtype=np.int32)
+        self._column[used] = np.arange(len(used), dtype=np.int32)
+        self._weights = np.zeros((len(used) + 1, len(classes)), dtype=np.float32)
+        self._weights[:-1] = centroids[:, used].T.toarray()
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], labels: Sequence[str]) -> "CentroidModel":
+        counts = _hash_ngrams(texts)
+        n_docs = counts.shape[0]
+        doc_freq = np.bincount(counts.indices, minlength=N_FEATURES)  # before _tfidf reuses counts
+        idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+        x = _tfidf(counts, idf)
+
+        classes, y = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        members = sp.csr_matrix(
+            (np.ones(n_docs, dtype=np.float32), (y, np.arange(n_docs))),
+            shape=(len(classes), n_docs),
+        )
+        centroids = _normalize_rows((members @ x).tocsr())
+        return cls(classes, idf, centroids)
+
+    def scores(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), n_classes) cosine similarities."""
+        x = _tfidf(_hash_ngrams(texts), self.idf)
+        x = sp.csr_matrix((x.data, self._column[x.indices], x.indptr), shape=(x.shape[0], len(self._weights)))
+        return x @ self._weights
+
+    def predict(
+        self, texts: Sequence[str], min_score: float = CLASSIFIER_MIN_SCORE
+    ) -> Tuple[List[Optional[str]], np.ndarray]:
+        """(labels, best scores); None where the best score is below min_score."""
+        if not len(texts):
+            return [], np.empty(0, dtype=np.float32)
+        s = self.scores(texts)
+        best = s.argmax(axis=1)
+        score = s[np.arange(len(best)), best]
+        labels = self.classes[best].astype(object)
+        labels[score < min_score] = None
+        return labels.tolist(), score
+
+    def save(self, path: str = CLASSIFIER_MODEL_PATH) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        c = self.centroids
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            version=np.array(MODEL_VERSION),
+            classes=self.classes,
+            idf=self.idf,
+            data=c.data,
+            indices=c.indices,
+            indptr=c.indptr,
+        )
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = CLASSIFIER_MODEL_PATH) -> Optional["CentroidModel"]:
+        """The saved model, or None if there is none / it's from another version."""
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                if str(f["version"]) != MODEL_VERSION:
+                    return None
+                classes = f["classes"]
+                centroids = sp.csr_matrix(
+                    (f["data"], f["indices"], f["indptr"]), shape=(len(classes), N_FEATURES)
+                )
+                return cls(classes, f["idf"], centroids)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable category model {path}: {e}", flush=True)
+            return None
+
+
+# (path, mtime) -> model, so every process loads the file once
+_loaded: Dict[Tuple[str, float], Optional[CentroidModel]] = {}
+
+
+def load_model(path: str = CLASSIFIER_MODEL_PATH) -> Optional[CentroidModel]:
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    if key not in _loaded:
+        _loaded.clear()
+        _loaded[key] = CentroidModel.load(path)
+    return _loaded[key]
+
+
+# ---------------------------------------------------
+# Training
+# ---------------------------------------------------
+def train_from_db(holdout: float = 0.0, path: str = CLASSIFIER_MODEL_PATH) -> Optional[CentroidModel]:
+    from db import fetch_labelled_descriptions
+
+    pairs = fetch_labelled_descriptions()
+    if not pairs:
+        print("⚠️  No categorized parts in part_master - nothing to train on", flush=True)
+        return None
+    texts, labels = map(list, zip(*pairs))
+    print(f"📚 Training on {len(texts)} parts, {len(set(labels))} categories", flush=True)
+
+    if holdout > 0:
+        rng = np.random.default_rng(0)
+        test = rng.random(len(texts)) < holdout
+        if test.any() and not test.all():
+            idx_train, idx_test = np.flatnonzero(~test), np.flatnonzero(test)
+            model = CentroidModel.fit([texts[i] for i in idx_train], [labels[i] for i in idx_train])
+            pred, _ = model.predict([texts[i] for i in idx_test], min_score=0.0)
+            acc = np.mean([p == labels[i] for p, i in zip(pred, idx_test)])
+            print(f"🎯 Hold-out accuracy ({len(idx_test)} parts): {acc:.1%}", flush=True)
+
+    model = CentroidModel.fit(texts, labels)
+    print(f"📂 Model saved to: {model.save(path)}", flush=True)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the category classifier from part_master")
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.0,
+        help="fraction of parts held out to report accuracy (the saved model uses all)",
+    )
+    train_from_db(holdout=parser.parse_args().holdout)
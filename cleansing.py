@@ -2,17 +2,25 @@
 
 import re
 import math
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
-from cleansing_config import COLUMN_SYNONYMS
+import vocabulary
+from cleansing_config import CATEGORICAL_COLUMNS
+from column_utils import map_distinct
+from config import CLEAN_CHUNK_ROWS, CLEAN_WORKERS
+from enrichment_text import enrich_from_description
+from pipeline_metrics import timed
 
 
 PREFIXES = ["sap", "vault", "powerbi", "po", "invoice", "user"]
 
 
+@lru_cache(maxsize=4096)
 def _normalize_name(name: str) -> str:
     """
     Normalize column/field name:
@@ -36,47 +44,80 @@ def _normalize_name(name: str) -> str:
     return s
 
 
-def normalize_and_merge_columns(df: pd.DataFrame) -> pd.DataFrame:
+class ColumnPlan(NamedTuple):
+    """How normalize_and_merge_columns reshapes one set of input columns."""
+    drop: Tuple               # synonym columns merged into another column
+    columns: Tuple            # labels of the remaining columns, in order
+    merges: Tuple             # (canonical, source columns left-to-right), ...
+
+
+def column_plan(columns: Tuple) -> ColumnPlan:
     """
-    1) Normalize names.
-    2) Apply COLUMN_SYNONYMS.
-    3) If multiple columns map to same canonical, keep ONE
-       and merge non-null values with priority left-to-right.
+    Resolve input columns against the column synonyms once; every frame
+    (or batch / chunk) with the same header reuses the plan until the
+    synonyms file changes.
     """
-    df = df.copy()
-    original_cols = list(df.columns)
+    return _column_plan(columns, vocabulary.digest("column_synonyms"))
 
-    # map original -> normalized
-    norm_map = {c: _normalize_name(c) for c in original_cols}
 
-    # map normalized -> canonical
-    groups = {}  # canonical -> list of original column names
-    for orig, norm in norm_map.items():
-        canonical = COLUMN_SYNONYMS.get(norm, norm)
+@lru_cache(maxsize=256)
+def _column_plan(columns: Tuple, synonyms_digest: str) -> ColumnPlan:
+    synonyms = vocabulary.table("column_synonyms")
+    groups: Dict[str, List] = {}  # canonical -> original column names
+    for orig in columns:
+        norm = _normalize_name(orig)
+        canonical = synonyms.get(norm, norm)
         groups.setdefault(canonical, []).append(orig)
 
-    new_df = df.copy()
-
+    renames = {}
+    drop = []
+    merges = []
     for canonical, cols in groups.items():
         if len(cols) == 1:
-            orig = cols[0]
-            if orig != canonical:
-                new_df = new_df.rename(columns={orig: canonical})
+            renames[cols[0]] = canonical
         else:
-            # combine multiple synonym columns into one
-            new_df[canonical] = None
-            for c in cols:
-                series = new_df[c]
-                series = series.replace({np.nan: None})
-                # where canonical is null and this column has value -> fill
-                mask = new_df[canonical].isna() & series.notna()
-                new_df.loc[mask, canonical] = series[mask]
-            # drop old synonym columns
-            for c in cols:
-                if c != canonical and c in new_df.columns:
-                    new_df = new_df.drop(columns=[c])
-
-    return new_df
+            # 'canonical' may itself be one of cols: it keeps its place,
+            # otherwise the merged column goes last
+            drop.extend(c for c in cols if c != canonical)
+            merges.append((canonical, tuple(cols)))
+
+    dropped = set(drop)
+    kept = tuple(renames.get(c, c) for c in columns if c not in dropped)
+    return ColumnPlan(tuple(drop), kept, tuple(merges))
+
+
+def _first_non_null(df: pd.DataFrame, cols: Sequence) -> pd.Series:
+    """Row-wise first non-null value over cols (a bfill across the group)."""
+    values = df[list(cols)].to_numpy(dtype=object)
+    present = ~pd.isna(values)
+    merged = values[np.arange(len(values)), present.argmax(axis=1)]
+    merged[~present.any(axis=1)] = None
+    return pd.Series(merged, index=df.index, dtype=object)
+
+
+def apply_column_plan(df: pd.DataFrame, plan: ColumnPlan, inplace: bool = False) -> pd.DataFrame:
+    merged = [(canonical, _first_non_null(df, cols)) for canonical, cols in plan.merges]
+    if inplace:
+        for c in plan.drop:
+            del df[c]  # no copy of the remaining columns
+        out = df
+    else:
+        out = df.drop(columns=list(plan.drop))
+    out.columns = list(plan.columns)
+    for canonical, series in merged:
+        out[canonical] = series
+    return out
+
+
+@timed()
+def normalize_and_merge_columns(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """
+    1) Normalize names.
+    2) Apply the column synonyms (vocabulary/column_synonyms.json).
+    3) If multiple columns map to same canonical, keep ONE
+       and merge non-null values with priority left-to-right.
+    """
+    return apply_column_plan(df, column_plan(tuple(df.columns)), inplace=inplace)
 
 
 def _clean_str(v):
@@ -90,14 +131,29 @@ def _clean_str(v):
     return s
 
 
-def basic_cleaning(df: pd.DataFrame) -> pd.DataFrame:
+def _clean_series(s: pd.Series) -> pd.Series:
+    """
+    _clean_str over a column, once per distinct value: columns repeat a
+    handful of values (vendors, plants, dates, ...), so factorize and
+    broadcast the cleaned uniques back. Missing values (None / NaN / NaT /
+    pd.NA) all become None.
+    """
+    if s.empty:
+        return s
+    return pd.Series(map_distinct(s, _clean_str), index=s.index, name=s.name)
+
+
+@timed()
+def basic_cleaning(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     - Strip whitespace
     - Normalize 'nan' / 'None' / empty -> None
     """
-    df = df.copy()
+    if not inplace:
+        return pd.DataFrame({col: _clean_series(df[col]) for col in df.columns}, index=df.index)
+    # column by column: only one old + new column pair is alive at a time
     for col in df.columns:
-        df[col] = df[col].apply(_clean_str)
+        df[col] = _clean_series(df[col])
     return df
 
 
@@ -107,38 +163,41 @@ DIM_PATTERN = re.compile(
 )
 
 
-def ensure_dimensions(df: pd.DataFrame) -> pd.DataFrame:
+@timed()
+def ensure_dimensions(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
-    If 'dimensions' missing or empty, try to infer from description.
+    If 'dimensions' missing or empty, try to infer from description
+    ("AxB unit", unit defaults to mm).
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     if "dimensions" not in df.columns:
         df["dimensions"] = None
 
-    def _infer_dim(row):
-        dim = row.get("dimensions")
-        if dim:
-            return dim
-        desc = row.get("description")
-        if not desc:
-            return None
-        m = DIM_PATTERN.search(desc)
-        if m:
-            a, b, unit = m.groups()
-            unit = unit or "mm"
-            return f"{a}x{b} {unit}"
-        return None
-
-    df["dimensions"] = df.apply(_infer_dim, axis=1)
+    dims = df["dimensions"].astype(object)
+    need = (dims.isna() | (dims == "")).to_numpy()
+    if need.any():
+        dims = dims.copy()
+        dims[need] = None
+        if "description" in df.columns:
+            m = df.loc[need, "description"].str.extract(DIM_PATTERN)
+            found = m[0].notna()
+            inferred = m[0] + "x" + m[1] + " " + m[2].fillna("mm")
+            # positional: the index may repeat labels
+            pos = np.flatnonzero(need)[found.to_numpy()]
+            dims.iloc[pos] = inferred[found].to_numpy()
+    df["dimensions"] = dims
     return df
 
 
-def ensure_category_columns(df: pd.DataFrame) -> pd.DataFrame:
+@timed()
+def ensure_category_columns(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     Make sure category_raw and category_master exist.
     For now, category_master = category_raw (enrichment may change later).
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     if "category_raw" not in df.columns:
         df["category_raw"] = None
     if "category_master" not in df.columns:
@@ -146,11 +205,13 @@ def ensure_category_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def ensure_core_fields(df: pd.DataFrame) -> pd.DataFrame:
+@timed()
+def ensure_core_fields(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     Make sure some core columns exist so later code doesn't break.
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     need_cols = [
         "part_number",
         "description",
@@ -168,16 +229,103 @@ def ensure_core_fields(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def cleanup_pipeline(df: pd.DataFrame) -> pd.DataFrame:
+# Leave a column as plain objects when more than this share of its rows
+# are distinct values (codes + categories would cost more than they save).
+_MAX_CATEGORY_RATIO = 0.5
+
+
+@timed()
+def to_categoricals(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """
+    Store CATEGORICAL_COLUMNS as pandas Categoricals: small integer codes
+    plus one copy of each distinct value, which is much cheaper to hold,
+    compare and group. Missing values become NaN. Run it last (after
+    enrichment), and again after concatenating frames whose categories
+    differ (pd.concat falls back to object columns).
+    """
+    if not inplace:
+        df = df.copy()
+    for c in CATEGORICAL_COLUMNS:
+        if c not in df.columns or isinstance(df[c].dtype, pd.CategoricalDtype):
+            continue
+        codes, uniques = pd.factorize(df[c])
+        if len(uniques) > len(df) * _MAX_CATEGORY_RATIO:
+            continue
+        df[c] = pd.Categorical.from_codes(codes, uniques)
+    return df
+
+
+@timed()
+def cleanup_pipeline(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     Full cleansing pipeline used by Stage1 and Stage2.
+
+    inplace=True hands df over to the pipeline: every step mutates and
+    returns that same frame instead of copying it, so the caller must not
+    use df afterwards (only the returned frame).
     """
     if df is None or df.empty:
         return pd.DataFrame()
 
-    df = normalize_and_merge_columns(df)
-    df = basic_cleaning(df)
-    df = ensure_dimensions(df)
-    df = ensure_category_columns(df)
-    df = ensure_core_fields(df)
+    df = normalize_and_merge_columns(df, inplace=inplace)
+    return _cleanup_steps(df)
+
+
+def _cleanup_steps(df: pd.DataFrame) -> pd.DataFrame:
+    """Everything after column normalization, in place on a frame we own."""
+    df = basic_cleaning(df, inplace=True)
+    df = ensure_dimensions(df, inplace=True)
+    df = ensure_category_columns(df, inplace=True)
+    df = ensure_core_fields(df, inplace=True)
     return df
+
+
+def _clean_chunk(args) -> pd.DataFrame:
+    """Worker entry point: one row chunk, with the column plan already resolved."""
+    chunk, plan, enrich = args
+    df = _cleanup_steps(apply_column_plan(chunk, plan, inplace=True))
+    if enrich:
+        df = enrich_from_description(df, inplace=True)
+    return df
+
+
+@timed()
+def cleanup_pipeline_parallel(
+    df: pd.DataFrame,
+    workers: Optional[int] = None,
+    chunk_rows: int = CLEAN_CHUNK_ROWS,
+    enrich: bool = False,
+) -> pd.DataFrame:
+    """
+    cleanup_pipeline (then enrich_from_description when enrich=True) over
+    row chunks in a process pool. Every step after column normalization
+    is row-independent, so the column plan is resolved once here and the
+    cleaned chunks are concatenated back in order: same result as the
+    serial pipeline. Frames under two chunks are cleaned serially, in
+    place (df is handed over either way).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if workers is None:
+        workers = CLEAN_WORKERS
+    workers = max(1, min(workers, len(df) // chunk_rows))
+
+    if workers == 1:
+        df = cleanup_pipeline(df, inplace=True)
+        return enrich_from_description(df, inplace=True) if enrich else df
+
+    plan = column_plan(tuple(df.columns))
+    tasks = ((df.iloc[start:start + chunk_rows], plan, enrich) for start in range(0, len(df), chunk_rows))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pd.concat(pool.map(_clean_chunk, tasks))
+
+
+def cleanup_pipeline_batches(batches: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Streaming cleanup_pipeline: clean each batch as it arrives (in place,
+    batches are handed over) so only one batch is alive at a time.
+    """
+    for batch in batches:
+        cleaned = cleanup_pipeline(batch, inplace=True)
+        if not cleaned.empty:
+            yield cleaned
@@ -0,0 +1,36 @@
+# column_utils.py
+"""
+Column helpers shared by cleansing, mapping, merging and survivorship:
+apply a scalar function to a column once per distinct value instead of
+once per row (columns repeat a handful of vendors, plants, sources, ...).
+"""
+
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+
+def distinct_codes(col: pd.Series) -> Tuple[np.ndarray, List[Any]]:
+    """
+    (codes, uniques) with col[i] == uniques[codes[i]]; missing cells
+    (None / NaN / NaT / pd.NA) get code -1. Categoricals reuse their codes.
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy(), list(col.cat.categories)
+    if col.dtype == object and infer_dtype(col, skipna=True) not in ("string", "empty"):
+        # mixed types: 7 and 7.0 factorize together but print differently,
+        # so every cell stands for itself
+        values = col.to_numpy()
+        codes = np.arange(len(values))
+        codes[pd.isna(values)] = -1
+        return codes, values.tolist()
+    codes, uniques = pd.factorize(col)
+    return codes, list(uniques)
+
+
+def map_distinct(col: pd.Series, fn: Callable[[Any], Any], missing: Any = None) -> np.ndarray:
+    """fn over every cell of col (object array), called once per distinct value; missing cells -> missing."""
+    codes, uniques = distinct_codes(col)
+    return np.array([fn(u) for u in uniques] + [missing], dtype=object)[codes]
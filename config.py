@@ -18,6 +18,84 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Snapshots are Parquet; also write an .xlsx copy next to them when set.
+SNAPSHOT_EXCEL = os.environ.get("SNAPSHOT_EXCEL", "0") == "1"
+
+# ---------- STAGE 1 ----------
+# Worker processes used to parse source files in parallel (1 = serial).
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+
+# Max rows per DataFrame batch when streaming CSV/XLSX sources.
+INGEST_BATCH_ROWS = int(os.environ.get("INGEST_BATCH_ROWS", 50_000))
+
+# On-disk cache of cleaned per-file frames (Parquet), keyed by content hash.
+INGEST_CACHE_DIR = os.environ.get("INGEST_CACHE_DIR", os.path.join(BASE_DIR, "cache", "ingest"))
+INGEST_CACHE_MAX_MB = int(os.environ.get("INGEST_CACHE_MAX_MB", 1024))
+
+# Read only header rows first and skip files (CSV, an Excel file's first
+# sheet) / PDF pages / tables that have no column resolving to part_number
+# (their rows would be dropped anyway).
+INGEST_PRESCAN = os.environ.get("INGEST_PRESCAN", "1") == "1"
+
+# ---------- METRICS ----------
+# Per-stage timings/memory of Stage 1 / Stage 2 runs, one JSON line per
+# stage ("" = don't write, the summary table is still printed).
+METRICS_PATH = os.environ.get("METRICS_PATH", os.path.join(OUTPUT_DIR, "pipeline_metrics.jsonl"))
+# Also trace Python allocations (tracemalloc) per stage; slows the run down.
+METRICS_TRACEMALLOC = os.environ.get("METRICS_TRACEMALLOC", "0") == "1"
+
+# ---------- CLEANSING ----------
+# Worker processes for chunk-parallel cleansing + enrichment (1 = serial).
+CLEAN_WORKERS = int(os.environ.get("CLEAN_WORKERS", os.cpu_count() or 1))
+
+# Rows per chunk; frames smaller than two chunks are cleaned serially.
+CLEAN_CHUNK_ROWS = int(os.environ.get("CLEAN_CHUNK_ROWS", 100_000))
+
+# ---------- VOCABULARIES ----------
+# JSON keyword / column-synonym tables (materials.json, categories.json,
+# column_synonyms.json); edits are picked up without a restart.
+VOCAB_DIR = os.environ.get("VOCAB_DIR", os.path.join(BASE_DIR, "vocabulary"))
+
+# ---------- ENRICHMENT ----------
+# Persistent description -> (material, category) cache shared across runs
+# (SQLite file, "" = off). Every run already infers each distinct
+# description only once; this also skips the ones seen in earlier runs.
+ENRICH_CACHE_PATH = os.environ.get("ENRICH_CACHE_PATH", "")
+ENRICH_CACHE_MAX_ENTRIES = int(os.environ.get("ENRICH_CACHE_MAX_ENTRIES", 500_000))
+
+# category_master for parts the keyword rules leave uncategorized, from a
+# TF-IDF nearest-centroid model trained on part_master
+# (python category_classifier.py). No model file = no predictions.
+CLASSIFIER_ENABLED = os.environ.get("CLASSIFIER_ENABLED", "1") == "1"
+CLASSIFIER_MODEL_PATH = os.environ.get(
+    "CLASSIFIER_MODEL_PATH", os.path.join(BASE_DIR, "cache", "category_model.npz")
+)
+# Minimum cosine similarity to the best category's centroid.
+CLASSIFIER_MIN_SCORE = float(os.environ.get("CLASSIFIER_MIN_SCORE", 0.2))
+
+# ---------- NEAR DUPLICATES ----------
+# After each Stage 1 run, update the MinHash/LSH index of part texts and
+# write candidate duplicate clusters (output/near_duplicate_clusters.json).
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "1") == "1"
+DEDUP_INDEX_PATH = os.environ.get("DEDUP_INDEX_PATH", os.path.join(BASE_DIR, "cache", "near_duplicates.npz"))
+# Minimum estimated Jaccard similarity of two parts' shingle sets.
+DEDUP_MIN_SIMILARITY = float(os.environ.get("DEDUP_MIN_SIMILARITY", 0.8))
+
+# ---------- PDF ----------
+# Table extraction backend: "pdfplumber" or "pymupdf" (much faster).
+PDF_BACKEND = os.environ.get("PDF_BACKEND", "pdfplumber")
+
+# Worker processes for page-parallel PDF extraction (1 = serial).
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+
+# ---------- OCR ----------
+# OCR fallback for PDF pages without a text layer (needs the tesseract binary).
+OCR_ENABLED = os.environ.get("OCR_ENABLED", "1") == "1"
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+OCR_DPI = int(os.environ.get("OCR_DPI", 300))
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join(BASE_DIR, "cache", "ocr"))
+
 # ---------- DATABASE ----------
 DB_CONFIG = {
     "host": "localhost",
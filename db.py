@@ -2,7 +2,7 @@
 
 import os
 import math
-from typing import Dict, Any, Iterable, List, Sequence
+from typing import Dict, Any, Iterable, List, Sequence, Tuple
 from urllib.parse import urlparse
 from datetime import datetime
 
@@ -196,3 +196,30 @@ def fetch_part_by_number(part_number: str) -> Dict[str, Any] | None:
     cur.close()
     conn.close()
     return dict(zip(cols, row))
+
+
+def fetch_labelled_descriptions() -> List[Tuple[str, str]]:
+    """
+    (description, category_master) of parts categorized by a source, i.e.
+    with a category_raw too; training data for category_classifier.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+
+    needed = {"description", "category_raw", "category_master"}
+    if not needed <= set(_get_existing_columns(cur)):
+        cur.close()
+        conn.close()
+        return []
+
+    cur.execute("""
+        SELECT description, category_master
+        FROM part_master
+        WHERE NULLIF(TRIM(description), '') IS NOT NULL
+          AND NULLIF(TRIM(category_raw), '') IS NOT NULL
+          AND NULLIF(TRIM(category_master), '') IS NOT NULL;
+    """)
+    rows = [(d.strip(), c.strip()) for d, c in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return rows
@@ -0,0 +1,104 @@
+# enrichment_cache.py
+"""
+Optional persistent cache of description enrichment across runs
+(ENRICH_CACHE_PATH, a SQLite file; off when empty).
+
+- key   = sha256(keyword-table version + normalized description)
+- value = (material, category) inferred from that description
+
+Editing a keyword table changes its version, so old entries simply stop
+being hit and age out. Each entry records when it was last used, and
+store() trims the least recently used ones above ENRICH_CACHE_MAX_ENTRIES.
+Any SQLite error (locked, corrupt, read-only disk) only disables the cache
+for that call.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import ENRICH_CACHE_MAX_ENTRIES, ENRICH_CACHE_PATH
+
+Value = Tuple[Optional[str], Optional[str]]
+
+# SQLite's default limit on bound parameters is 999
+_BATCH = 500
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS enrichment (
+        key      TEXT PRIMARY KEY,
+        material TEXT,
+        category TEXT,
+        used     REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS enrichment_used ON enrichment (used)",
+]
+
+
+def enabled() -> bool:
+    return bool(ENRICH_CACHE_PATH)
+
+
+def cache_key(version: str, text: str) -> str:
+    return hashlib.sha256(f"{version}\0{text}".encode()).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(ENRICH_CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(ENRICH_CACHE_PATH, timeout=30)
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _batches(items: List, size: int = _BATCH) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def lookup(keys: List[str]) -> Dict[str, Value]:
+    """Cached values for keys (misses are absent); marks hits as used."""
+    if not enabled() or not keys:
+        return {}
+    found: Dict[str, Value] = {}
+    try:
+        with closing(_connect()) as conn, conn:
+            for batch in _batches(keys):
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, material, category FROM enrichment WHERE key IN ({marks})", batch
+                )
+                for key, material, category in rows:
+                    found[key] = (material, category)
+            now = time.time()
+            hits = list(found)
+            for batch in _batches(hits):
+                marks = ",".join("?" * len(batch))
+                conn.execute(f"UPDATE enrichment SET used = ? WHERE key IN ({marks})", [now, *batch])
+    except sqlite3.Error as e:
+        print(f"⚠️  Enrichment cache unavailable ({e}); continuing without", flush=True)
+        return {}
+    return found
+
+
+def store(items: Dict[str, Value], max_entries: int = ENRICH_CACHE_MAX_ENTRIES) -> None:
+    """Insert / refresh items, then drop the least recently used overflow."""
+    if not enabled() or not items:
+        return
+    now = time.time()
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO enrichment (key, material, category, used) VALUES (?, ?, ?, ?)",
+                [(key, material, category, now) for key, (material, category) in items.items()],
+            )
+            conn.execute(
+                "DELETE FROM enrichment WHERE key IN ("
+                "SELECT key FROM enrichment ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            )
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not update enrichment cache ({e}); continuing without", flush=True)
@@ -1,81 +1,184 @@
 # enrichment_text.py
 
+import hashlib
+import json
 import re
-from typing import Dict, Any
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+import category_classifier
+import enrichment_cache
+import vocabulary
+from config import CLASSIFIER_ENABLED
+from pipeline_metrics import timed
 
-MATERIAL_KEYWORDS = {
-    "steel": "Steel",
-    "stainless": "Stainless Steel",
-    "aluminum": "Aluminum",
-    "aluminium": "Aluminum",
-    "copper": "Copper",
-    "brass": "Brass",
-    "nylon": "Nylon",
-    "plastic": "Plastic",
-    "rubber": "Rubber",
-}
-
-
-CATEGORY_KEYWORDS = {
-    "bearing": "Bearing",
-    "bracket": "Bracket",
-    "valve": "Valve",
-    "roller": "Roller",
-    "screw": "Screw",
-    "motor": "Motor",
-    "clamp": "Clamp",
-    "solenoid": "Solenoid",
-}
-
-
-def _infer_material_from_text(text: str) -> str | None:
-    low = text.lower()
-    for k, v in MATERIAL_KEYWORDS.items():
-        if k in low:
-            return v
-    return None
-
-
-def _infer_category_from_text(text: str) -> str | None:
-    low = text.lower()
-    for k, v in CATEGORY_KEYWORDS.items():
-        if k in low:
-            return v
-    return None
-
-
-def enrich_from_description(df: pd.DataFrame) -> pd.DataFrame:
+
+class KeywordMatcher:
     """
-    Use simple NLP-style keyword rules to fill material, category_raw/category_master
-    if missing, based on description.
+    A {keyword: value} table compiled into one regex, for "the value of the
+    FIRST keyword (in table order) that occurs in the lower-cased text".
+
+    The keywords form a trie-shaped regex that returns, at each position,
+    the longest keyword starting there. A lookahead lets it report every
+    position. Every keyword starting at the same position is a prefix of
+    that longest one, so precomputing the best-priority prefix of each
+    keyword gives the table-order winner. One regex pass covers any
+    number of keywords.
+    """
+
+    def __init__(self, table: Dict[str, str]):
+        keys = [k for k in table if k]
+        self.values = [table[k] for k in keys]
+        priority = {k: i for i, k in enumerate(keys)}
+        # best (lowest) priority among the keywords that are prefixes of k
+        self._best = {
+            k: min(priority[k[:n]] for n in range(1, len(k) + 1) if k[:n] in priority)
+            for k in keys
+        }
+        self.regex = re.compile(f"(?=({_trie_pattern(keys)}))") if keys else None
+        self.version = hashlib.sha256(
+            json.dumps(list(table.items()), ensure_ascii=False).encode()
+        ).hexdigest()[:16]
+
+    def first(self, text: str) -> Optional[str]:
+        """Value for one (already lower-cased) text, or None."""
+        return self.match([text])[0]
+
+    def match(self, texts: Iterable[str]) -> List[Optional[str]]:
+        """first() for many lower-cased strings (None = no match)."""
+        if self.regex is None:
+            return [None for _ in texts]
+        # findall, not Series.str.extractall: building its MultiIndex
+        # costs twice the regex pass itself
+        findall, best, values = self.regex.findall, self._best, self.values
+        out = []
+        for text in texts:
+            hits = findall(text)
+            out.append(values[min(best[h] for h in hits)] if hits else None)
+        return out
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """Greedy regex matching the longest of words at a position."""
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+# Keyword tables live in vocabulary/materials.json and categories.json;
+# each is compiled once and again only after the file changes.
+def material_matcher() -> KeywordMatcher:
+    return vocabulary.compiled("materials", KeywordMatcher)
+
+
+def category_matcher() -> KeywordMatcher:
+    return vocabulary.compiled("categories", KeywordMatcher)
+
+
+def infer_descriptions(texts: List[str]) -> Tuple[List[Optional[str]], List[Optional[str]]]:
     """
-    df = df.copy()
+    (materials, categories) for distinct lower-cased descriptions, answered
+    from the persistent enrichment cache where possible.
+    """
+    materials, categories = material_matcher(), category_matcher()
+    if not enrichment_cache.enabled():
+        return materials.match(texts), categories.match(texts)
+
+    version = f"{materials.version}|{categories.version}"
+    keys = [enrichment_cache.cache_key(version, t) for t in texts]
+    cached = enrichment_cache.lookup(keys)
+    misses = [i for i, k in enumerate(keys) if k not in cached]
+    if misses:
+        miss_texts = [texts[i] for i in misses]
+        inferred = zip(materials.match(miss_texts), categories.match(miss_texts))
+        new = {keys[i]: value for i, value in zip(misses, inferred)}
+        enrichment_cache.store(new)
+        cached.update(new)
+    values = [cached[k] for k in keys]
+    return [m for m, _ in values], [c for _, c in values]
+
+
+def _is_blank(s) -> np.ndarray:
+    """Falsy cells (None, "", 0, False); NaN is truthy, as in a plain `if not v`."""
+    values = np.asarray(s, dtype=object)
+    return np.equal(values, None) | (values == "") | (values == 0)
+
+
+@timed()
+def enrich_from_description(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """
+    Use simple NLP-style keyword rules to fill material, category_raw/category_master
+    if missing, based on description. Parts still without a category get
+    category_master from the category classifier, when a model is trained.
 
-    def _enrich_row(row: Dict[str, Any]) -> Dict[str, Any]:
-        desc = row.get("description") or ""
-        desc = str(desc).strip()
-        if not desc:
-            return row
+    Only those three columns are rewritten; inplace=True sets them on df
+    itself instead of a copy.
+    """
+    if not inplace:
+        df = df.copy()
+    cols = ["material", "category_raw", "category_master"]
+    for c in cols:
+        if c not in df.columns:
+            df[c] = None
+    if df.empty:
+        return df
+
+    desc = df["description"] if "description" in df.columns else pd.Series(None, index=df.index)
+    text = desc.mask(_is_blank(desc), "").astype(str).str.strip()
+    has_desc = (text != "").to_numpy()
+
+    material = df["material"].to_numpy(dtype=object, copy=True)
+    cat_raw = df["category_raw"].to_numpy(dtype=object, copy=True)
+    cat_master = df["category_master"].to_numpy(dtype=object, copy=True)
+    raw_blank = _is_blank(df["category_raw"])
+
+    need_mat = has_desc & _is_blank(df["material"])
+    need_cat = has_desc & raw_blank
+    rows = np.flatnonzero(need_mat | need_cat)
+    if len(rows):
+        # the same description recurs across sources: infer once per text
+        codes, uniques = pd.factorize(text.iloc[rows].str.lower())
+        mats, cats = infer_descriptions(list(uniques))
+        mats = np.array(mats, dtype=object)[codes]
+        cats = np.array(cats, dtype=object)[codes]
 
         # material
-        if not row.get("material"):
-            mat = _infer_material_from_text(desc)
-            if mat:
-                row["material"] = mat
-
-        # category
-        if not row.get("category_raw"):
-            cat = _infer_category_from_text(desc)
-            if cat:
-                row["category_raw"] = cat
-                row["category_master"] = cat
-        elif not row.get("category_master"):
-            row["category_master"] = row["category_raw"]
-
-        return row
-
-    df = df.apply(lambda r: pd.Series(_enrich_row(r.to_dict())), axis=1)
+        hit = need_mat[rows] & pd.notna(mats)
+        material[rows[hit]] = mats[hit]
+
+        # category: inferred -> raw + master
+        hit = need_cat[rows] & pd.notna(cats)
+        cat_raw[rows[hit]] = cats[hit]
+        cat_master[rows[hit]] = cats[hit]
+
+    # category_raw given, master missing: master falls back to raw
+    fill = has_desc & ~raw_blank & _is_blank(df["category_master"])
+    cat_master[fill] = df["category_raw"].to_numpy(dtype=object)[fill]
+
+    # still uncategorized: category_master from the trained classifier
+    # (category_raw stays empty - no source said so)
+    model = category_classifier.load_model() if CLASSIFIER_ENABLED else None
+    rows = np.flatnonzero(has_desc & _is_blank(cat_master)) if model is not None else []
+    if len(rows):
+        codes, uniques = pd.factorize(text.iloc[rows])
+        labels = np.array(model.predict(list(uniques))[0], dtype=object)[codes]
+        hit = pd.notna(labels)
+        cat_master[rows[hit]] = labels[hit]
+
+    for c, values in zip(cols, (material, cat_raw, cat_master)):
+        df[c] = pd.Series(values, index=df.index, dtype=object)
     return df
@@ -0,0 +1,156 @@
+# ingestion_cache.py
+"""
+Persistent cache of CLEANED per-file frames for Stage 1.
+
+- key   = sha256(file content) + source system + pipeline version
+- value = <INGEST_CACHE_DIR>/<key>.parquet
+
+The pipeline version is PIPELINE_VERSION plus a fingerprint of the modules,
+settings (_OUTPUT_SETTINGS) and category model that shape a cleaned frame,
+so editing cleansing / enrichment code, changing e.g. CLASSIFIER_MIN_SCORE
+or retraining invalidates old entries automatically. So does editing a
+vocabulary file (keywords, column synonyms). Entry mtime doubles as "last used";
+evict() drops the least recently used entries above INGEST_CACHE_MAX_MB.
+"""
+
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+import config
+import vocabulary
+from config import BASE_DIR, CLASSIFIER_ENABLED, CLASSIFIER_MODEL_PATH, INGEST_CACHE_DIR, INGEST_CACHE_MAX_MB
+
+# Bump to invalidate every entry by hand (e.g. after a pandas upgrade).
+PIPELINE_VERSION = "1"
+
+# Modules whose code decides what a cleaned frame looks like.
+_PIPELINE_MODULES = [
+    "ingestion_utils.py",
+    "ocr_ingestion.py",
+    "cleansing.py",
+    "cleansing_config.py",
+    "enrichment_text.py",
+    "category_classifier.py",
+    "column_utils.py",
+    "vocabulary.py",
+]
+
+# config values that change what a cleaned frame contains (worker counts,
+# batch / chunk sizes and cache locations don't)
+_OUTPUT_SETTINGS = [
+    "PDF_BACKEND",
+    "INGEST_PRESCAN",
+    "OCR_ENABLED",
+    "OCR_DPI",
+    "OCR_LANG",
+    "CLASSIFIER_ENABLED",
+    "CLASSIFIER_MIN_SCORE",
+]
+
+_CHUNK = 1024 * 1024
+
+# vocabulary digests -> version (vocabularies can change while a process runs)
+_pipeline_version: Dict[Tuple[str, ...], str] = {}
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pipeline_version() -> str:
+    vocab = tuple(vocabulary.digest(name) for name in vocabulary.NAMES)
+    if vocab not in _pipeline_version:
+        h = hashlib.sha256(PIPELINE_VERSION.encode())
+        h.update("|".join(f"{name}={getattr(config, name)!r}" for name in _OUTPUT_SETTINGS).encode())
+        for name in _PIPELINE_MODULES:
+            path = os.path.join(BASE_DIR, name)
+            if os.path.exists(path):
+                h.update(_hash_file(path).encode())
+        h.update("|".join(vocab).encode())
+        # a retrained category model changes enriched frames too
+        if CLASSIFIER_ENABLED and os.path.exists(CLASSIFIER_MODEL_PATH):
+            h.update(_hash_file(CLASSIFIER_MODEL_PATH).encode())
+        _pipeline_version[vocab] = h.hexdigest()[:16]
+    return _pipeline_version[vocab]
+
+
+def cache_key(path: str, system: str) -> str:
+    raw = f"{pipeline_version()}|{system}|{_hash_file(path)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(INGEST_CACHE_DIR, f"{key}.parquet")
+
+
+def load_cached(key: str) -> Optional[pd.DataFrame]:
+    """Cleaned frame for key, or None on a miss / unreadable entry."""
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        print(f"⚠️  Dropping unreadable cache entry {path}: {e}", flush=True)
+        _remove(path)
+        return None
+    os.utime(path)  # mark as recently used
+    return df
+
+
+def store(key: str, df: pd.DataFrame) -> None:
+    """Write atomically; a frame pyarrow can't encode is just not cached."""
+    os.makedirs(INGEST_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️  Could not cache frame ({e}); continuing without", flush=True)
+        _remove(tmp)
+
+
+def evict(max_mb: int = INGEST_CACHE_MAX_MB) -> int:
+    """
+    Delete least recently used entries until the cache fits in max_mb.
+    Returns the number of entries removed.
+    """
+    if not os.path.isdir(INGEST_CACHE_DIR):
+        return 0
+
+    entries = []
+    for name in os.listdir(INGEST_CACHE_DIR):
+        if not name.endswith(".parquet"):
+            continue
+        path = os.path.join(INGEST_CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    limit = max_mb * 1024 * 1024
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
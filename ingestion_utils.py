@@ -1,83 +1,502 @@
 # ingestion_utils.py
 
+import heapq
+import io
 import os
-from typing import Optional
+import re
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import pandas as pd
 import pdfplumber
+import pymupdf
+from openpyxl import load_workbook
+
+import ocr_ingestion
+import vocabulary
+from cleansing import _normalize_name
+from config import INGEST_BATCH_ROWS, INGEST_PRESCAN, OCR_ENABLED, PDF_BACKEND, PDF_WORKERS
 
 
 VALID_EXT = {".csv", ".xlsx", ".xls", ".pdf"}
 
 
-def load_excel_or_csv_from_filelike(file_obj, ext: str) -> pd.DataFrame:
+# ---------------------------------------------------
+# Header pre-scan
+# ---------------------------------------------------
+# Rows only survive Stage 1 grouping / Stage 2 filtering with a part_number,
+# so a sheet, PDF page or table without a column resolving to it is skipped
+# after reading its header instead of being parsed in full.
+_KEY_COLUMN = "part_number"
+
+
+def _key_token_regex(synonyms: Dict[str, str]) -> "re.Pattern":
+    """Any name resolving to part_number, as whole '_'-separated tokens of normalized page text."""
+    names = sorted(
+        {_KEY_COLUMN} | {n for n, canonical in synonyms.items() if canonical == _KEY_COLUMN},
+        key=len,
+        reverse=True,
+    )
+    return re.compile(r"(?:^|_)(?:" + "|".join(map(re.escape, names)) + r")(?:_|$)")
+
+
+def has_key_column(columns: Iterable) -> bool:
+    """True if any column name resolves to part_number (cleansing rules)."""
+    synonyms = vocabulary.table("column_synonyms")
+    for c in columns:
+        if c is None:
+            continue
+        norm = _normalize_name(c)
+        if synonyms.get(norm, norm) == _KEY_COLUMN:
+            return True
+    return False
+
+
+def _text_may_have_key(text: str) -> bool:
+    """Cheap page check: can a table header on this page name part_number?"""
+    key_token = vocabulary.compiled("column_synonyms", _key_token_regex)
+    return key_token.search(re.sub(r"[^a-z0-9]+", "_", text.lower())) is not None
+
+
+def _rewind(source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _source_name(source) -> str:
+    return getattr(source, "name", None) or str(source)
+
+
+def _first_row(ws):
+    """First non-blank row of an openpyxl (read-only) sheet, or None."""
+    return next((r for r in ws.iter_rows(values_only=True) if any(v is not None for v in r)), None)
+
+
+def _first_sheet_has_key(source, ext: str) -> bool:
+    """Does the header row of the first sheet (the one we read) have a part_number column?"""
+    if ext == ".xlsx":
+        wb = load_workbook(source, read_only=True, data_only=True)
+        try:
+            header = _first_row(wb.worksheets[0]) or ()
+        finally:
+            wb.close()
+    else:
+        header = pd.read_excel(source, nrows=0).columns
+    _rewind(source)
+    if has_key_column(header):
+        return True
+    print(f"⏭️  {_source_name(source)}: no part_number column in the first sheet, skipping", flush=True)
+    return False
+
+
+def _csv_has_key(source) -> bool:
+    header = pd.read_csv(source, nrows=0).columns
+    _rewind(source)
+    if has_key_column(header):
+        return True
+    print(f"⏭️  {_source_name(source)}: no part_number column, skipping", flush=True)
+    return False
+
+
+# ---------------------------------------------------
+# CSV / Excel
+# ---------------------------------------------------
+def _read_table(source, ext: str, prescan: bool) -> pd.DataFrame:
+    if ext == ".csv":
+        if prescan and not _csv_has_key(source):
+            return pd.DataFrame()
+        return pd.read_csv(source, memory_map=isinstance(source, str))
+    if prescan and not _first_sheet_has_key(source, ext):
+        return pd.DataFrame()
+    return pd.read_excel(source)
+
+
+def load_excel_or_csv_from_filelike(file_obj, ext: str, prescan: bool = INGEST_PRESCAN) -> pd.DataFrame:
     """
-    For uploaded Django files (InMemoryUploadedFile).
+    For in-memory file objects (Django uploads go through upload_path).
+    Excel: the first sheet only; with prescan, skipped when its header
+    has no part_number column.
     """
     file_obj.seek(0)
-    if ext == ".csv":
-        return pd.read_csv(file_obj)
+    return _read_table(file_obj, ext, prescan)
+
+
+def load_excel_or_csv(path: str, prescan: bool = INGEST_PRESCAN) -> pd.DataFrame:
+    ext = os.path.splitext(path)[1].lower()
+    return _read_table(path, ext, prescan)
+
+
+# ---------------------------------------------------
+# PDF table backends
+# ---------------------------------------------------
+# A backend takes (source, page_indexes) and lazily yields
+# (page_idx, [table, ...]) per page, where table = list of rows, row 0 = header.
+
+def _open_pymupdf(source):
+    if isinstance(source, (bytes, bytearray)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source)
+
+
+def _pdfplumber_tables(source, page_indexes: Sequence[int]) -> Iterator[Tuple[int, list]]:
+    if not page_indexes:
+        return  # pdfplumber treats an empty page list as "all pages"
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with pdfplumber.open(source, pages=[i + 1 for i in page_indexes]) as pdf:
+        for page_idx, page in zip(page_indexes, pdf.pages):
+            tables = page.extract_tables()
+            page.close()  # drop pdfplumber's per-page object cache
+            yield page_idx, tables
+
+
+# Tables in our source PDFs run past the page edge; pdfplumber keeps those
+# cells, so PyMuPDF must not clip to the page either.
+_NO_CLIP = pymupdf.Rect(-1e5, -1e5, 1e5, 1e5)
+
+
+def _pymupdf_tables(source, page_indexes: Sequence[int]) -> Iterator[Tuple[int, list]]:
+    doc = _open_pymupdf(source)
+    try:
+        for page_idx in page_indexes:
+            tables = []
+            for tab in doc[page_idx].find_tables(clip=_NO_CLIP).tables:
+                rows = tab.extract()
+                if tab.header.external:
+                    rows = [tab.header.names] + rows
+                tables.append(rows)
+            yield page_idx, tables
+    finally:
+        doc.close()
+
+
+PDF_BACKENDS: Dict[str, Callable[..., Iterator[Tuple[int, list]]]] = {
+    "pdfplumber": _pdfplumber_tables,
+    "pymupdf": _pymupdf_tables,
+}
+
+# Don't start a process pool for fewer pages than this per worker.
+_MIN_PAGES_PER_WORKER = 4
+
+# Pages per pool task; at most 2 tasks per worker are in flight, so rows
+# waiting to be consumed stay bounded whatever the page count.
+_PAGES_PER_TASK = 8
+
+
+def _get_backend(backend: Optional[str]):
+    name = (backend or PDF_BACKEND).lower()
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r}; expected one of {sorted(PDF_BACKENDS)}")
+    return name
+
+
+def _iter_rows(page_tables: Iterable[Tuple[int, list]], prescan: bool = False) -> Iterator[Dict[str, Any]]:
+    for page_idx, tables in page_tables:
+        for t in tables:
+            if not t:
+                continue
+            header = t[0]
+            if prescan and not has_key_column(header):
+                continue
+            data_rows = t[1:]
+            for r in data_rows:
+                row_dict = {}
+                for col, val in zip(header, r):
+                    if col is None:
+                        continue
+                    col = str(col).strip()
+                    row_dict[col] = val
+                if row_dict:
+                    row_dict["pdf_page"] = page_idx + 1
+                    yield row_dict
+
+
+def _extract_page_range(args) -> List[Dict[str, Any]]:
+    """Worker entry point: one small page range of one PDF."""
+    backend, source, page_indexes, prescan = args
+    return list(_iter_rows(PDF_BACKENDS[backend](source, page_indexes), prescan))
+
+
+def _iter_rows_parallel(
+    backend: str, source: str, pages: List[int], workers: int, prescan: bool
+) -> Iterator[Dict[str, Any]]:
+    chunks = iter([pages[i:i + _PAGES_PER_TASK] for i in range(0, len(pages), _PAGES_PER_TASK)])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(
+            pool.submit(_extract_page_range, (backend, source, chunk, prescan))
+            for chunk in islice(chunks, 2 * workers)
+        )
+        while pending:
+            rows = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(pool.submit(_extract_page_range, (backend, source, chunk, prescan)))
+            yield from rows
+
+
+def _classify_pages(doc, prescan: bool) -> Tuple[List[int], List[int]]:
+    """
+    (pages for the table backend, text-less pages for OCR).
+    With prescan, text pages whose text can't hold a part_number header
+    are dropped before any table finding.
+    """
+    pages, scanned = [], []
+    for i, page in enumerate(doc):
+        text = page.get_text("text")
+        if not text.strip():
+            if OCR_ENABLED:
+                scanned.append(i)
+            elif not prescan:
+                pages.append(i)
+        elif not prescan or _text_may_have_key(text):
+            pages.append(i)
+    return pages, scanned
+
+
+def iter_pdf_rows(
+    source,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+    prescan: bool = INGEST_PRESCAN,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield one dict per table row, in page order.
+
+    Pages with a text layer go through the selected backend, page by page
+    (or in small page ranges across a process pool for file paths); pages
+    without one go through the OCR fallback (when OCR_ENABLED). With
+    prescan, pages and tables that can't yield a part_number are skipped.
+
+    workers is the caller's process budget for both the page pool and OCR
+    (default: PDF_WORKERS pages, OCR_WORKERS OCR); 1 starts no pool at all.
+    """
+    backend = _get_backend(backend)
+    ocr_workers = None if workers is None else min(workers, ocr_ingestion.OCR_WORKERS)
+    doc = _open_pymupdf(source)
+    try:
+        pages, scanned = _classify_pages(doc, prescan)
+        ocr_tables = ocr_ingestion.ocr_page_tables(source, doc, scanned, ocr_workers) if scanned else []
+    finally:
+        doc.close()
+
+    if workers is None:
+        workers = PDF_WORKERS
+    workers = max(1, min(workers, len(pages) // _MIN_PAGES_PER_WORKER))
+
+    if workers == 1 or not isinstance(source, str):
+        rows = _iter_rows(PDF_BACKENDS[backend](source, pages), prescan)
     else:
-        return pd.read_excel(file_obj)
+        rows = _iter_rows_parallel(backend, source, pages, workers, prescan)
 
+    if ocr_tables:
+        rows = heapq.merge(rows, _iter_rows(ocr_tables, prescan), key=lambda r: r["pdf_page"])
+    yield from rows
 
-def load_pdf_tables_from_filelike(file_obj) -> pd.DataFrame:
+
+def iter_pdf_batches(
+    source,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+    batch_rows: int = INGEST_BATCH_ROWS,
+) -> Iterator[pd.DataFrame]:
     """
-    Use pdfplumber on in-memory PDF.
+    iter_pdf_rows() as DataFrames of batch_rows rows: memory stays flat
+    however many pages the PDF has, and the first batch is ready as soon
+    as its pages are parsed.
     """
+    batch = []
+    for row in iter_pdf_rows(source, backend, workers):
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+
+def iter_pdf_batches_from_filelike(
+    file_obj, backend: Optional[str] = None, batch_rows: int = INGEST_BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """In-memory PDFs (uploads) are parsed serially."""
     file_obj.seek(0)
-    rows = []
+    yield from iter_pdf_batches(file_obj.read(), backend, workers=1, batch_rows=batch_rows)
 
-    with pdfplumber.open(file_obj) as pdf:
-        for page_idx, page in enumerate(pdf.pages):
-            tables = page.extract_tables()
-            for t in tables:
-                if not t:
-                    continue
-                header = t[0]
-                data_rows = t[1:]
-                for r in data_rows:
-                    row_dict = {}
-                    for col, val in zip(header, r):
-                        if col is None:
-                            continue
-                        col = str(col).strip()
-                        row_dict[col] = val
-                    if row_dict:
-                        row_dict["pdf_page"] = page_idx + 1
-                        rows.append(row_dict)
-
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
-
-
-def load_excel_or_csv(path: str) -> pd.DataFrame:
-    ext = os.path.splitext(path)[1].lower()
+
+def _concat_batches(batches: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    batches = list(batches)
+    if not batches:
+        return pd.DataFrame()
+    if len(batches) == 1:
+        return batches[0]
+    return pd.concat(batches, ignore_index=True)
+
+
+def load_pdf_tables_from_filelike(file_obj, backend: Optional[str] = None) -> pd.DataFrame:
+    """
+    Extract tables from an in-memory PDF (uploads are parsed serially).
+    """
+    return _concat_batches(iter_pdf_batches_from_filelike(file_obj, backend))
+
+
+def load_pdf_tables(
+    path: str, backend: Optional[str] = None, workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    backend: "pdfplumber" / "pymupdf" (default: config.PDF_BACKEND)
+    workers: page-parallel processes (default: config.PDF_WORKERS)
+    """
+    return _concat_batches(iter_pdf_batches(path, backend, workers))
+
+
+# ---------------------------------------------------
+# Streaming readers (bounded memory)
+# ---------------------------------------------------
+def _excel_header(cells) -> List[str]:
+    """
+    Column names the way pd.read_excel builds them:
+    blank -> 'Unnamed: i', repeated -> 'name.1', 'name.2', ...
+    """
+    names = []
+    seen = {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or str(c).strip() == "" else c
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _iter_sheet_batches(ws, batch_rows: int) -> Iterator[pd.DataFrame]:
+    rows = (r for r in ws.iter_rows(values_only=True) if any(v is not None for v in r))
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _excel_header(header)
+    width = len(columns)
+
+    batch = []
+    for r in rows:
+        batch.append(r[:width])
+        if len(batch) >= batch_rows:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch, columns=columns)
+
+
+def _iter_xlsx_batches(source, batch_rows: int, prescan: bool) -> Iterator[pd.DataFrame]:
+    """
+    openpyxl read-only iter_rows, so only one batch of cells is ever
+    materialised. Same as load_excel_or_csv(): the first sheet only,
+    skipped with prescan when its header has no part_number column.
+    """
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        if prescan and not has_key_column(_first_row(ws) or ()):
+            print(f"⏭️  {_source_name(source)}: no part_number column in the first sheet, skipping", flush=True)
+            return
+        yield from _iter_sheet_batches(ws, batch_rows)
+    finally:
+        wb.close()
+
+
+def _iter_table_batches(source, ext: str, batch_rows: int, prescan: bool) -> Iterator[pd.DataFrame]:
     if ext == ".csv":
-        return pd.read_csv(path)
+        if prescan and not _csv_has_key(source):
+            return
+        yield from pd.read_csv(source, chunksize=batch_rows, memory_map=isinstance(source, str))
+    elif ext == ".xlsx":
+        yield from _iter_xlsx_batches(source, batch_rows, prescan)
     else:
-        return pd.read_excel(path)
+        # legacy .xls has no streaming reader: load once, hand out slices
+        df = _read_table(source, ext, prescan)
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
 
 
-def load_pdf_tables(path: str) -> pd.DataFrame:
-    rows = []
-    with pdfplumber.open(path) as pdf:
-        for page_idx, page in enumerate(pdf.pages):
-            tables = page.extract_tables()
-            for t in tables:
-                if not t:
-                    continue
-                header = t[0]
-                data_rows = t[1:]
-                for r in data_rows:
-                    row_dict = {}
-                    for col, val in zip(header, r):
-                        if col is None:
-                            continue
-                        col = str(col).strip()
-                        row_dict[col] = val
-                    if row_dict:
-                        row_dict["pdf_page"] = page_idx + 1
-                        rows.append(row_dict)
-    return pd.DataFrame(rows) if rows else pd.DataFrame()
+def iter_excel_or_csv(
+    path: str, batch_rows: int = INGEST_BATCH_ROWS, prescan: bool = INGEST_PRESCAN
+) -> Iterator[pd.DataFrame]:
+    ext = os.path.splitext(path)[1].lower()
+    yield from _iter_table_batches(path, ext, batch_rows, prescan)
+
+
+# ---------------------------------------------------
+# Django uploads
+# ---------------------------------------------------
+_SPOOL_CHUNK = 1024 * 1024
+
+
+def _is_upload(obj) -> bool:
+    return hasattr(obj, "name") and hasattr(obj, "read")
+
+
+@contextmanager
+def upload_path(upload) -> Iterator[str]:
+    """
+    A filesystem path for a Django upload, so parsers read from disk
+    instead of a bytes copy: TemporaryUploadedFile's own temp file, or
+    (in-memory uploads) the upload spooled to a temp file chunk by chunk.
+    """
+    if hasattr(upload, "temporary_file_path"):
+        yield upload.temporary_file_path()
+        return
+
+    ext = os.path.splitext(upload.name)[1].lower()
+    fd, path = tempfile.mkstemp(suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            upload.seek(0)
+            if hasattr(upload, "chunks"):
+                chunks = upload.chunks(_SPOOL_CHUNK)
+            else:
+                chunks = iter(lambda: upload.read(_SPOOL_CHUNK), b"")
+            for chunk in chunks:
+                out.write(chunk)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def _iter_path_batches(path: str, ext: str, batch_rows: int, workers: Optional[int]) -> Iterator[pd.DataFrame]:
+    if ext == ".pdf":
+        yield from iter_pdf_batches(path, workers=workers, batch_rows=batch_rows)
+    else:
+        yield from _iter_table_batches(path, ext, batch_rows, INGEST_PRESCAN)
+
+
+def iter_file_batches(path_or_file, batch_rows: int = INGEST_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Streaming counterpart of load_file(): yields DataFrames of at most
+    batch_rows rows, for CSV/XLSX and (page by page) for PDFs.
+    Errors are reported and end the stream for that file, like load_file.
+    """
+    is_upload = _is_upload(path_or_file)
+    if not is_upload and not isinstance(path_or_file, str):
+        raise TypeError("iter_file_batches() expected a file path string or file-like object.")
+
+    name = path_or_file.name if is_upload else path_or_file
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in VALID_EXT:
+        print("⚠️ Unsupported file type:", ext)
+        return
+
+    try:
+        if is_upload:
+            # serial PDFs: don't start a process pool inside a web worker
+            with upload_path(path_or_file) as path:
+                yield from _iter_path_batches(path, ext, batch_rows, workers=1)
+        else:
+            yield from _iter_path_batches(path_or_file, ext, batch_rows, workers=None)
+    except Exception as e:
+        print(f"⚠️ Failed to stream {name}: {e}")
 
 
 def load_file(path_or_file) -> Optional[pd.DataFrame]:
@@ -85,26 +504,28 @@ def load_file(path_or_file) -> Optional[pd.DataFrame]:
     Accepts BOTH:
     - File path string
     - Django InMemoryUploadedFile / TemporaryUploadedFile
+      (parsed from disk, see upload_path)
     """
 
     # ---------------------------------------------------
     # CASE 1: Django upload file-like object
     # ---------------------------------------------------
-    if hasattr(path_or_file, "name") and hasattr(path_or_file, "read"):
+    if _is_upload(path_or_file):
         filename = path_or_file.name
         ext = os.path.splitext(filename)[1].lower()
-        print("DEBUG — load_file detected upload:", filename)
 
         if ext not in VALID_EXT:
             print("⚠️ Unsupported uploaded file type:", ext)
             return pd.DataFrame()
 
         try:
-            if ext in {".csv", ".xlsx", ".xls"}:
-                return load_excel_or_csv_from_filelike(path_or_file, ext)
+            with upload_path(path_or_file) as path:
+                if ext in {".csv", ".xlsx", ".xls"}:
+                    return _read_table(path, ext, INGEST_PRESCAN)
 
-            elif ext == ".pdf":
-                return load_pdf_tables_from_filelike(path_or_file)
+                elif ext == ".pdf":
+                    # serial: don't start a process pool inside a web worker
+                    return load_pdf_tables(path, workers=1)
 
         except Exception as e:
             print(f"⚠️ Failed to load uploaded file {filename}: {e}")
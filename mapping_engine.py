@@ -2,10 +2,20 @@
 """
 Enterprise mapping of raw system-specific columns → normalized master schema
 with full source_payload JSON preserved.
+
+- map_group_to_master: one part's rows (dicts)
+- map_frame_to_master: every part of a DataFrame at once, same result
+  (rows of the highest-PRIORITY source first, then lower ones, then
+  sources not in PRIORITY, each in row order; first non-empty key wins)
 """
 
 import math
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from column_utils import map_distinct
 
 
 def _val(v):
@@ -28,6 +38,7 @@ PRIORITY = [
     "invoices",
     "user_upload",
 ]
+_RANK = {src: i for i, src in enumerate(PRIORITY)}
 
 FIELD_MAP = {
     "description": [
@@ -132,19 +143,38 @@ def build_payload(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
       ...
     }
     """
+    return _payload((r.get("source_system", "unknown"), _clean_row_for_payload(r)) for r in rows)
+
+
+def _payload(items: Iterable) -> Dict[str, Any]:
+    """build_payload from (source_system, cleaned row) pairs."""
     payload: Dict[str, Any] = {}
-    for r in rows:
-        sys = r.get("source_system", "unknown") or "unknown"
-        sys = str(sys)
-        cleaned = _clean_row_for_payload(r)
+    for sys, cleaned in items:
         if not cleaned:
             continue
+        sys = str(sys or "unknown")
         if sys not in payload:
             payload[sys] = []
         payload[sys].append(cleaned)
     return payload
 
 
+MASTER_COLUMNS = [
+    "part_number",
+    "description",
+    "material",
+    "dimensions",
+    "category_raw",
+    "category_master",
+    "cost",
+    "currency",
+    "vendor_name",
+    "source_system",
+    "source_file",
+    "source_payload",
+]
+
+
 def map_group_to_master(part_number: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
     master = {
         "part_number": part_number,
@@ -173,5 +203,97 @@ def map_group_to_master(part_number: str, rows: List[Dict[str, Any]]) -> Dict[st
     if rows:
         master["source_system"] = rows[0].get("source_system")
         master["source_file"] = rows[0].get("source_file")
-
     return master
+
+
+# ---------------------------------------------------
+# DataFrame-level resolution
+# ---------------------------------------------------
+def _val_column(s: pd.Series) -> np.ndarray:
+    """_val over a column, once per distinct value (missing -> None)."""
+    return map_distinct(s, _val)
+
+
+def _first_present(columns: List[np.ndarray], n: int) -> np.ndarray:
+    """Row-wise first non-None over columns (left to right)."""
+    out = np.full(n, None, dtype=object)
+    missing = np.ones(n, dtype=bool)
+    for values in columns:
+        take = missing & ~np.equal(values, None)
+        out[take] = values[take]
+        missing &= ~take
+    return out
+
+
+_DROPPED = object()
+
+
+def _clean_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    [_clean_row_for_payload(r) for r in df.to_dict("records")], with the
+    None / NaN checks done per column.
+    """
+    columns = []
+    for _, col in df.items():
+        values = np.empty(len(col), dtype=object)
+        values[:] = col.tolist()  # native Python scalars, as to_dict gives
+        drop = pd.isna(col).to_numpy()
+        if col.dtype == object:
+            # pd.isna also flags NaT / pd.NA, which the payload keeps
+            for i in np.flatnonzero(drop & ~np.equal(values, None)):
+                drop[i] = isinstance(values[i], float)
+        values[drop] = _DROPPED
+        columns.append(values.tolist())
+    keys = [str(c) for c in df.columns]
+    return [{k: v for k, v in zip(keys, row) if v is not _DROPPED} for row in zip(*columns)]
+
+
+def map_frame_to_master(
+    df: pd.DataFrame, key: str = "part_number", payload: bool = True
+) -> pd.DataFrame:
+    """
+    map_group_to_master for every part in df at once: one row per distinct
+    df[key] (in order of first appearance, stored as part_number),
+    MASTER_COLUMNS columns.
+    payload=False leaves source_payload empty (it's the only per-row
+    Python step).
+    """
+    n = len(df)
+    if n == 0:
+        return pd.DataFrame(columns=MASTER_COLUMNS, dtype=object)
+    codes, parts = pd.factorize(df[key], use_na_sentinel=False)  # in order of first appearance
+    if "source_system" in df.columns:
+        rank = df["source_system"].map(_RANK).to_numpy(dtype=float, na_value=-1)
+    else:
+        rank = np.full(n, -1.0)
+    # part, then resolution order: rank descending, then row order
+    order = np.lexsort((np.arange(n), -rank, codes))
+    rows = df.iloc[order]
+    group = codes[order]
+
+    resolved = pd.DataFrame({"_group": group})
+    for field, keys in FIELD_MAP.items():
+        columns = [_val_column(rows[k]) for k in keys if k in rows.columns]
+        resolved[field] = _first_present(columns, n)
+    master = resolved.groupby("_group", sort=True)[list(FIELD_MAP)].first()  # first non-empty
+    master = master.astype(object).where(master.notna(), None).reset_index(drop=True)
+
+    # "best" source_system/file: each part's first row in resolution order
+    first = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    for c in ("source_system", "source_file"):
+        master[c] = rows[c].to_numpy(dtype=object)[first] if c in rows.columns else None
+    master["part_number"] = np.asarray(parts, dtype=object)
+    master["category_master"] = None
+
+    if payload:
+        cleaned = _clean_records(df)
+        systems = df["source_system"].tolist() if "source_system" in df.columns else ["unknown"] * n
+        # rows of each part in df order
+        by_part = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(parts)))[:-1]
+        master["source_payload"] = [
+            _payload((systems[i], cleaned[i]) for i in idx.tolist()) for idx in np.split(by_part, bounds)
+        ]
+    else:
+        master["source_payload"] = None
+    return master[MASTER_COLUMNS]
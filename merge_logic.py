@@ -5,13 +5,25 @@ Final merge logic for taxonomy tool.
 - Stage 1: merge multiple source rows (SAP/Vault/PowerBI/PO/Invoice)
            into ONE canonical record per part_number.
 - Stage 2: merge existing DB row + one or more user-upload rows.
+
+Which row's value a field keeps follows the survivorship rules
+(survivorship_config.py); plan=survivorship.LAST_WINS is the plain
+"later rows override earlier ones".
 """
 
 from __future__ import annotations
 
 import json
 import math
-from typing import Dict, List, Any, Optional
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from column_utils import distinct_codes
+from survivorship import PLAN, GroupedRows, PartFold, Plan
 
 
 # === Utility functions ======================================================
@@ -51,39 +63,192 @@ def _clean_for_json(obj: Any) -> Any:
 
 # === Stage 1: merge rows from multiple systems ==============================
 
-def merge_records_by_part_number(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _accumulate_record(
+    fold: PartFold, sources: List[Dict[str, Any]], r: Dict[str, Any]
+) -> None:
+    """Fold one source row into a part's running merge state."""
+    # accumulate sources
+    src = {
+        "source_system": _safe_str(r.get("source_system")),
+        "source_file": _safe_str(r.get("source_file")),
+    }
+    if src["source_system"] or src["source_file"]:
+        sources.append(src)
+
+    # merge non-missing fields ("sources" we overwrite ourselves)
+    fold.add(r, _is_missing, skip=("sources",))
+
+
+def _finalize_record(merged: Dict[str, Any], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # final sources JSON (text)
+    merged["sources"] = json.dumps(_clean_for_json(sources), ensure_ascii=False)
+    return merged
+
+
+def merge_records_by_part_number(rows: List[Dict[str, Any]], plan: Plan = PLAN) -> Dict[str, Any]:
     """
     Merge multiple source rows for the same part_number.
 
     Strategy:
-    - Iterate rows in order; later rows override earlier ones
-      (you already control priority by ordering input list).
+    - Iterate rows in order; each field keeps the value its survivorship
+      rule picks (ties: later rows override earlier ones, so input order
+      still decides among equals).
     - 'sources' field becomes a JSON list of:
         {"source_system": "...", "source_file": "..."}
     """
 
-    merged: Dict[str, Any] = {}
+    fold = PartFold(plan)
     sources: List[Dict[str, Any]] = []
 
     for r in rows:
-        # accumulate sources
-        src = {
-            "source_system": _safe_str(r.get("source_system")),
-            "source_file": _safe_str(r.get("source_file")),
-        }
-        if src["source_system"] or src["source_file"]:
-            sources.append(src)
-
-        # merge non-missing fields
-        for k, v in r.items():
-            if k in ("sources",):  # we overwrite this ourselves
-                continue
-            if not _is_missing(v):
-                merged[k] = v
+        _accumulate_record(fold, sources, r)
 
-    # final sources JSON (text)
-    merged["sources"] = json.dumps(_clean_for_json(sources), ensure_ascii=False)
+    return _finalize_record(fold.values, sources)
 
+
+def merge_record_stream(records: Iterable[Dict[str, Any]], plan: Plan = PLAN) -> List[Dict[str, Any]]:
+    """
+    Group by part_number AND merge in a single pass over a record stream.
+
+    Same result as grouping everything first and calling
+    merge_records_by_part_number per part, but only the running merge
+    state (one dict per part) is kept instead of every source row.
+    """
+    state: Dict[Any, Tuple[PartFold, List[Dict[str, Any]]]] = {}
+
+    for r in records:
+        pn = r.get("part_number")
+        if not pn:
+            continue
+        if pn not in state:
+            state[pn] = (PartFold(plan), [])
+        fold, sources = state[pn]
+        _accumulate_record(fold, sources, r)
+
+    return [_finalize_record(fold.values, sources) for fold, sources in state.values()]
+
+
+# === Stage 1, DataFrame-native ==============================================
+
+def _missing_mask(col: pd.Series) -> np.ndarray:
+    """_is_missing for every cell of col, as df.to_dict() would hand it over."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        missing = [_is_missing(c) for c in col.cat.categories] + [True]  # code -1 = NaN
+        return np.array(missing, dtype=bool)[col.cat.codes.to_numpy()]
+    if isinstance(col.dtype, np.dtype) and col.dtype.kind == "f":
+        return np.isnan(col.to_numpy())
+    if isinstance(col.dtype, np.dtype) and col.dtype != object:
+        return np.zeros(len(col), dtype=bool)  # ints, bools, datetimes (NaT isn't missing)
+
+    values = col.to_numpy(dtype=object)
+    codes, uniques = pd.factorize(values)  # None / NaN / NaT / NA -> -1
+    missing = np.array([_is_missing(u) for u in uniques] + [False], dtype=bool)[codes]
+    # None / float NaN are missing, NaT / pd.NA aren't (to_dict boxes numpy
+    # floats, so any float NaN counts)
+    na = np.flatnonzero(codes == -1)
+    missing[na] = np.equal(values[na], None)
+    rest = na[~missing[na]]
+    try:
+        values[rest].astype(np.float64)  # the common case: all float NaN
+        missing[rest] = True
+    except (TypeError, ValueError):
+        missing[rest] = [isinstance(v, (float, np.floating)) for v in values[rest]]
+    return missing
+
+
+def _safe_str_codes(col: Optional[pd.Series], n: int) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """_safe_str over a column as (codes, strings); every row None when it doesn't exist."""
+    if col is None:
+        return np.zeros(n, dtype=np.int64), [None]
+    codes, uniques = distinct_codes(col)
+    codes = np.where(codes < 0, len(uniques), codes)  # missing -> trailing None
+    return codes, [_safe_str(u) for u in uniques] + [None]
+
+
+def _source_entries(df: pd.DataFrame) -> np.ndarray:
+    """Each row's JSON "sources" entry, or None when it has neither field."""
+    n = len(df)
+    system_codes, systems = _safe_str_codes(df.get("source_system"), n)
+    file_codes, files = _safe_str_codes(df.get("source_file"), n)
+    codes, pairs = pd.factorize(system_codes.astype(np.int64) * len(files) + file_codes)
+    texts = []
+    for pair in pairs.tolist():
+        s, f = systems[pair // len(files)], files[pair % len(files)]
+        src = {"source_system": s, "source_file": f}
+        texts.append(json.dumps(_clean_for_json(src), ensure_ascii=False) if s or f else None)
+    return np.array(texts, dtype=object)[codes]
+
+
+def merge_frame_by_part_number(df: pd.DataFrame, plan: Plan = PLAN) -> List[Dict[str, Any]]:
+    """
+    merge_record_stream(df.to_dict("records")) without a dict per row:
+    the same records (values, key order, sources JSON), computed per column.
+
+    - rows are grouped by part_number (output in order of first appearance)
+      and stably sorted by part, so each part's rows keep source order
+    - per column: a missing mask matching _is_missing, then each part's
+      surviving row (GroupedRows.winners) and first non-missing row
+      (minimum.reduceat)
+    - a record's keys are the columns some row filled, in the order the
+      row-by-row merge inserts them (by first filling row, then column);
+      parts sharing that layout become dicts together
+    - sources: one JSON entry per distinct (system, file), joined per part
+    """
+    if df.empty or "part_number" not in df.columns:
+        return []
+
+    codes, parts = pd.factorize(df["part_number"].to_numpy(dtype=object))
+    # parts with a falsy part_number ("", 0, missing) are skipped
+    kept = np.array([bool(p) for p in parts], dtype=bool)
+    renumber = np.full(len(parts) + 1, -1)
+    renumber[np.flatnonzero(kept)] = np.arange(kept.sum())
+    codes = renumber[codes]  # -1 stays -1 (last slot)
+
+    rows = np.flatnonzero(codes >= 0)
+    if not len(rows):
+        return []
+    by_part = np.argsort(codes[rows], kind="stable")
+    order = rows[by_part]  # df positions, grouped by part, in source order
+    group = codes[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    n_parts, m = len(starts), len(order)
+    pos = np.arange(m)
+    grouped = GroupedRows(df, order, starts, plan)
+
+    labels = [c for c in df.columns if c != "sources"]  # sources is rebuilt below
+    first_fill = np.empty((n_parts, len(labels)), dtype=np.int64)
+    values = np.empty((n_parts, len(labels) + 1), dtype=object)
+    for j, label in enumerate(labels):
+        col = df[label]
+        present = ~_missing_mask(col)[order]
+        winner = grouped.winners(label, col, present)
+        first_fill[:, j] = np.minimum.reduceat(np.where(present, pos, m), starts)
+        values[:, j] = col.take(order[np.maximum(winner, 0)]).tolist()  # boxed like to_dict
+
+    entries = _source_entries(df)[order]
+    has_entry = ~np.equal(entries, None)
+    it = iter(entries[has_entry].tolist())
+    counts = np.bincount(group[has_entry], minlength=n_parts)
+    values[:, -1] = ["[" + ", ".join(islice(it, c)) + "]" for c in counts.tolist()]
+
+    # layout = filled columns by first filling row (ties: column order)
+    filled = (first_fill < m).sum(axis=1)
+    layout = np.argsort(first_fill, axis=1, kind="stable").astype(np.int32)
+    layout[np.arange(len(labels)) >= filled[:, None]] = -1
+    layout = np.ascontiguousarray(layout)
+    keys = layout.view(np.dtype((np.void, layout.dtype.itemsize * layout.shape[1]))).ravel()
+    _, first_of, which = np.unique(keys, return_index=True, return_inverse=True)
+
+    pick = []  # per layout: (keys, getter of those values from a values row)
+    for i in first_of.tolist():
+        cols = layout[i, :filled[i]].tolist() + [len(labels)]
+        names = [labels[j] for j in cols[:-1]] + ["sources"]
+        pick.append((names, itemgetter(*cols) if len(cols) > 1 else lambda row: (row[-1],)))
+    rows = values.tolist()
+    merged = []
+    for p, u in enumerate(which.tolist()):
+        names, get = pick[u]
+        merged.append(dict(zip(names, get(rows[p]))))
     return merged
 
 
@@ -153,6 +318,10 @@ DB_COLUMNS: List[str] = [
 ]
 
 
+# what priority rules rank an existing DB row as (no source lists it)
+DB_SOURCE = "part_master"
+
+
 def _parse_sources_json(s: Any) -> List[Dict[str, Any]]:
     """Decode existing sources JSON from DB row."""
     if _is_missing(s):
@@ -174,33 +343,31 @@ def _parse_sources_json(s: Any) -> List[Dict[str, Any]]:
 
 
 def merge_db_with_user(
-    db_row: Optional[Dict[str, Any]], user_rows: List[Dict[str, Any]]
+    db_row: Optional[Dict[str, Any]], user_rows: List[Dict[str, Any]], plan: Plan = PLAN
 ) -> Dict[str, Any]:
     """
     Final Stage-2 merge rule:
 
     - Start with an empty record with all DB columns = None.
-    - Overlay DB row values.
-    - Overlay each user row (last user row wins).
-      User non-empty values override DB values.
+    - Fold in the DB row, then each user row, by the survivorship rules.
+      The DB row ranks below every listed source, so under "last" and
+      "priority" rules user non-empty values override DB values (last
+      user row wins).
     - Maintain 'sources' as a JSON array:
         - existing entries from DB
         - plus user_upload entries for each user file
     """
 
     merged: Dict[str, Any] = {col: None for col in DB_COLUMNS}
+    fold = PartFold(plan, merged)
 
     # 1) base from DB
     if db_row:
-        for col in DB_COLUMNS:
-            if col in db_row and not _is_missing(db_row[col]):
-                merged[col] = db_row[col]
+        fold.add(db_row, _is_missing, keys=DB_COLUMNS, source=DB_SOURCE)
 
-    # 2) overlay user rows (later rows win)
+    # 2) user rows
     for r in user_rows:
-        for col in DB_COLUMNS:
-            if col in r and not _is_missing(r[col]):
-                merged[col] = r[col]
+        fold.add(r, _is_missing, keys=DB_COLUMNS, source=r.get("source_system", "user_upload"))
 
     # 3) ensure part_number is string and not empty
     pn = user_rows[-1].get("part_number") or (db_row or {}).get("part_number")
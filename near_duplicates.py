@@ -0,0 +1,311 @@
+# near_duplicates.py
+"""
+Near-duplicate parts: the same physical part under several part_numbers
+(e.g. a SAP material code and a Vault drawing number).
+
+- shingles:  description + material + dimensions, lower-cased, split into
+             tokens (in sorted order, so word order doesn't matter);
+             character 4-grams of the words, and every token containing
+             a digit as a whole, NUMBER_WEIGHT times (38x195 and 39x19
+             share nothing, and that difference dominates)
+- signature: NUM_PERM MinHash values per part (vectorized with numpy)
+- LSH:       BANDS bands of ROWS values; parts sharing a band bucket are
+             candidates, kept when their estimated Jaccard similarity
+             reaches DEDUP_MIN_SIMILARITY; clusters are the connected
+             components of the kept pairs
+
+Nothing is compared pairwise: bucketing is a sort per band, and a
+bucket's members are only checked against its first member.
+
+The index (part_numbers, a fingerprint of each part's text, signatures)
+persists at DEDUP_INDEX_PATH. update() re-signs only new / changed parts.
+Stage 1 updates it after every run and writes the clusters to
+output/near_duplicate_clusters.json; it can also be rebuilt from the
+Stage 1 snapshot:
+
+    python near_duplicates.py [--rebuild]
+"""
+
+import argparse
+import json
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from config import DEDUP_INDEX_PATH, DEDUP_MIN_SIMILARITY, OUTPUT_DIR
+
+# Bump when shingling / hashing changes (old index files are then rebuilt).
+INDEX_VERSION = "1"
+
+NUM_PERM = 128
+BANDS, ROWS = 32, 4  # candidate threshold ~ (1 / BANDS) ** (1 / ROWS) = 0.42
+SHINGLE = 4
+# Shingles per token with a digit: a size or code outweighs a few letters
+# (same words + different size must not reach DEDUP_MIN_SIMILARITY).
+NUMBER_WEIGHT = 16
+
+CLUSTERS_PATH = os.path.join(OUTPUT_DIR, "near_duplicate_clusters.json")
+
+_FIELDS = ("description", "material", "dimensions")
+_TOKEN = re.compile(r"[^\W_]+(?:[.,]\d+)?")
+_TIMES = re.compile(r"(?<=\d)\s*[x×*]\s*(?=\d)")
+_UNIT = re.compile(r"(?<=\d)(?=[^\W\d_]{1,3}\b)")  # 195mm -> 195 mm
+_SEP = 0
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+_rng = np.random.default_rng(20240617)
+_PERM_A = _rng.integers(1, 2**32, NUM_PERM, dtype=np.uint32) | np.uint32(1)
+_PERM_B = _rng.integers(0, 2**32, NUM_PERM, dtype=np.uint32)
+
+
+# ---------------------------------------------------
+# Shingles / signatures
+# ---------------------------------------------------
+def normalize(description, material=None, dimensions=None) -> str:
+    """Sorted lower-case tokens; '38 X 195mm' -> '38x195 mm'."""
+    parts = [str(v) for v in (description, material, dimensions) if not pd.isna(v) and v != ""]
+    text = _UNIT.sub(" ", _TIMES.sub("x", " ".join(parts).lower()))
+    return " ".join(sorted(set(_TOKEN.findall(text))))
+
+
+def _shingles(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(doc index, uint32 shingle hash) pairs, grouped by doc."""
+    words, numbers = [], []
+    for text in texts:
+        tokens = text.split()
+        words.append(" ".join(t for t in tokens if not any(c.isdigit() for c in t)))
+        numbers.append([t for t in tokens if any(c.isdigit() for c in t)])
+
+    # character n-grams of the words: rolling hash over one codepoint array
+    padded = [f" {w} " if w else "" for w in words]
+    cps = np.frombuffer(("\x00".join(padded) + "\x00").encode("utf-32-le"), dtype=np.uint32)
+    doc = np.repeat(np.arange(len(texts), dtype=np.int64), [len(p) + 1 for p in padded])
+    m = len(cps) - SHINGLE + 1
+    if m > 0:
+        h = np.zeros(m, dtype=np.uint64)
+        valid = np.ones(m, dtype=bool)
+        for k in range(SHINGLE):
+            h = h * np.uint64(1_000_003) + cps[k:k + m]  # wraps mod 2**64
+            valid &= cps[k:k + m] != _SEP
+        gram_doc, gram_hash = doc[:m][valid], h[valid]
+    else:
+        gram_doc, gram_hash = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint64)
+
+    # whole tokens with digits (sizes, norms, codes), NUMBER_WEIGHT salted copies
+    num_doc = np.repeat(np.arange(len(texts), dtype=np.int64), [len(n) for n in numbers])
+    crc = np.fromiter(
+        (zlib.crc32(t.encode()) for n in numbers for t in n), dtype=np.uint64, count=len(num_doc)
+    )
+    salt = np.tile(np.arange(NUMBER_WEIGHT, dtype=np.uint64) << np.uint64(44), len(crc))
+    num_doc = np.repeat(num_doc, NUMBER_WEIGHT)
+    num_hash = np.repeat(crc, NUMBER_WEIGHT) | salt | np.uint64(1 << 40)
+
+    doc = np.concatenate([gram_doc, num_doc])
+    hashes = np.concatenate([gram_hash, num_hash])
+    hashes = ((hashes * _MIX) >> np.uint64(32)).astype(np.uint32)
+    order = np.argsort(doc, kind="stable")
+    return doc[order], hashes[order]
+
+
+def signatures(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (NUM_PERM MinHash values per text, mask of texts that had shingles).
+    Rows of texts without shingles are all 0xFFFFFFFF.
+    """
+    sig = np.full((len(texts), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    doc, hashes = _shingles(texts)
+    if not len(doc):
+        return sig, np.zeros(len(texts), dtype=bool)
+    starts = np.flatnonzero(np.concatenate(([True], doc[1:] != doc[:-1])))
+    docs = doc[starts]
+    permuted = np.empty_like(hashes)
+    for p in range(NUM_PERM):
+        # multiply-add mod 2**32, then fold the high bits down
+        np.multiply(hashes, _PERM_A[p], out=permuted)
+        permuted += _PERM_B[p]
+        permuted ^= permuted >> np.uint32(16)
+        sig[docs, p] = np.minimum.reduceat(permuted, starts)
+    has = np.zeros(len(texts), dtype=bool)
+    has[docs] = True
+    return sig, has
+
+
+def _fingerprint(texts: Iterable[str]) -> np.ndarray:
+    return np.fromiter((zlib.crc32(t.encode()) for t in texts), dtype=np.uint32)
+
+
+# ---------------------------------------------------
+# Index
+# ---------------------------------------------------
+class NearDuplicateIndex:
+    def __init__(self):
+        self.part_numbers = np.empty(0, dtype=object)
+        self.fingerprints = np.empty(0, dtype=np.uint32)
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.part_numbers)
+
+    @classmethod
+    def load(cls, path: str = DEDUP_INDEX_PATH) -> "NearDuplicateIndex":
+        """The saved index, or an empty one (none yet / other version)."""
+        index = cls()
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                if str(f["version"]) != INDEX_VERSION:
+                    print("🔁 Near-duplicate index format changed - rebuilding", flush=True)
+                    return index
+                index.part_numbers = f["part_numbers"].astype(object)
+                index.fingerprints = f["fingerprints"]
+                index.signatures = f["signatures"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable near-duplicate index {path}: {e}", flush=True)
+        return index
+
+    def save(self, path: str = DEDUP_INDEX_PATH) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            version=np.array(INDEX_VERSION),
+            part_numbers=self.part_numbers.astype(str),
+            fingerprints=self.fingerprints,
+            signatures=self.signatures,
+        )
+        os.replace(tmp, path)
+        return path
+
+    def update(self, df: pd.DataFrame) -> Set[str]:
+        """
+        Add / refresh the parts in df (part_number + description, material,
+        dimensions); only new or changed texts are re-signed. Parts whose
+        text yields no shingles are dropped. Returns the part_numbers
+        that were (re)signed.
+        """
+        if df.empty or "part_number" not in df.columns:
+            return set()
+        df = df.drop_duplicates("part_number", keep="last")
+        cols = [df[c] if c in df.columns else [None] * len(df) for c in _FIELDS]
+        texts = [normalize(*values) for values in zip(*cols)]
+        pns = df["part_number"].astype(str).to_numpy(dtype=object)
+        prints = _fingerprint(texts)
+
+        pos = pd.Index(self.part_numbers).get_indexer(pns)
+        known = pos >= 0
+        unchanged = np.zeros(len(pns), dtype=bool)
+        unchanged[known] = self.fingerprints[pos[known]] == prints[known]
+        todo = np.flatnonzero(~unchanged)
+        if not len(todo):
+            return set()
+
+        codes, distinct = pd.factorize(np.array([texts[i] for i in todo], dtype=object))
+        sig, has = signatures(list(distinct))
+        sig, has = sig[codes], has[codes]
+        self.remove(pns[todo])
+        keep = todo[has]
+        self.part_numbers = np.concatenate([self.part_numbers, pns[keep]])
+        self.fingerprints = np.concatenate([self.fingerprints, prints[keep]])
+        self.signatures = np.concatenate([self.signatures, sig[has]])
+        return set(pns[todo])
+
+    def remove(self, part_numbers: Iterable[str]) -> None:
+        drop = pd.Index(self.part_numbers).isin(list(part_numbers))
+        if drop.any():
+            self.part_numbers = self.part_numbers[~drop]
+            self.fingerprints = self.fingerprints[~drop]
+            self.signatures = self.signatures[~drop]
+
+    def candidate_pairs(self, min_similarity: float = DEDUP_MIN_SIMILARITY) -> pd.DataFrame:
+        """Pairs (a, b: row positions, similarity) sharing an LSH bucket and >= min_similarity."""
+        n = len(self)
+        pairs = []
+        for b in range(BANDS):
+            band = np.ascontiguousarray(self.signatures[:, b * ROWS:(b + 1) * ROWS])
+            _, bucket = np.unique(band.view(np.dtype((np.void, band.dtype.itemsize * ROWS))), return_inverse=True)
+            bucket = bucket.ravel()
+            order = np.argsort(bucket, kind="stable")
+            sorted_bucket = bucket[order]
+            first = np.concatenate(([True], sorted_bucket[1:] != sorted_bucket[:-1]))
+            leader = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+            member = ~first
+            pairs.append(np.stack([leader[member], order[member]], axis=1))
+        pairs = np.unique(np.concatenate(pairs), axis=0) if n else np.empty((0, 2), dtype=np.int64)
+        a, b = pairs[:, 0], pairs[:, 1]
+        similarity = (self.signatures[a] == self.signatures[b]).mean(axis=1)
+        keep = similarity >= min_similarity
+        return pd.DataFrame({"a": a[keep], "b": b[keep], "similarity": similarity[keep]})
+
+    def clusters(self, min_similarity: float = DEDUP_MIN_SIMILARITY) -> List[Dict]:
+        """Groups of 2+ part_numbers linked by candidate pairs, largest first."""
+        pairs = self.candidate_pairs(min_similarity)
+        if pairs.empty:
+            return []
+        n = len(self)
+        graph = coo_matrix((np.ones(len(pairs)), (pairs["a"], pairs["b"])), shape=(n, n))
+        _, label = connected_components(graph, directed=False)
+        linked = np.unique(np.concatenate([pairs["a"], pairs["b"]]))
+        pair_label = label[pairs["a"].to_numpy()]
+        min_sim = pd.Series(pairs["similarity"].to_numpy()).groupby(pair_label).min()
+
+        out = []
+        for lab, rows in pd.Series(linked).groupby(label[linked]):
+            out.append({
+                "part_numbers": sorted(self.part_numbers[rows.to_numpy()]),
+                "min_similarity": round(float(min_sim[lab]), 3),
+            })
+        out.sort(key=lambda c: (-len(c["part_numbers"]), c["part_numbers"]))
+        return out
+
+
+# ---------------------------------------------------
+# Stage 1 hook / CLI
+# ---------------------------------------------------
+def update_index(
+    records: pd.DataFrame, replace_all: bool = False, path: str = DEDUP_INDEX_PATH
+) -> List[Dict]:
+    """
+    Fold Stage 1's merged records into the persistent index and write the
+    clusters. replace_all: records are ALL parts (full runs), so parts
+    missing from them leave the index.
+    """
+    index = NearDuplicateIndex.load(path)
+    if replace_all and "part_number" in records.columns:
+        present = set(records["part_number"].astype(str))
+        index.remove([pn for pn in index.part_numbers if pn not in present])
+    changed = index.update(records)
+    index.save(path)
+
+    clusters = index.clusters()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    tmp = CLUSTERS_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"clusters": clusters}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, CLUSTERS_PATH)
+    print(
+        f"🧬 Near-duplicates: {len(changed)} parts re-signed, {len(index)} indexed, "
+        f"{len(clusters)} candidate clusters -> {CLUSTERS_PATH}",
+        flush=True,
+    )
+    return clusters
+
+
+if __name__ == "__main__":
+    from snapshot_io import read_snapshot, snapshot_columns
+
+    parser = argparse.ArgumentParser(description="Near-duplicate clusters from the Stage 1 snapshot")
+    parser.add_argument("--rebuild", action="store_true", help="discard the saved index first")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(DEDUP_INDEX_PATH):
+        os.remove(DEDUP_INDEX_PATH)
+    snapshot = os.path.join(OUTPUT_DIR, "stage1_master_snapshot.parquet")
+    columns = [c for c in ("part_number", *_FIELDS) if c in snapshot_columns(snapshot)]
+    update_index(read_snapshot(snapshot, columns=columns), replace_all=True)
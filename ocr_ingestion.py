@@ -0,0 +1,186 @@
+# ocr_ingestion.py
+"""
+OCR fallback for PDF pages without a text layer (scanned invoices,
+drawings, ...).
+
+- detect: ingestion_utils hands over pages with no extractable text
+- cache:  each page is keyed by a hash of its own content (drawing
+          operators + embedded image streams) and the OCR settings, so
+          the same scan re-uploaded in any PDF is answered from disk
+- OCR:    cache misses are rasterised with PyMuPDF, binarised with OpenCV
+          and read with Tesseract, in a process pool
+- parse:  word boxes -> lines -> cells (split on wide horizontal gaps);
+          the first multi-cell line is the header, like the text backends
+
+Returns the same [(page_idx, [table, ...]), ...] shape as the PDF backends
+in ingestion_utils.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import pymupdf
+import pytesseract
+
+from config import OCR_CACHE_DIR, OCR_DPI, OCR_LANG, OCR_WORKERS
+
+# Bump when the OCR / table parsing below changes its output.
+OCR_VERSION = "1"
+
+# A gap wider than this many times the line's text height starts a new cell.
+_CELL_GAP = 1.2
+
+
+# ---------------------------------------------------
+# Page identity
+# ---------------------------------------------------
+def page_key(doc, page_idx: int) -> str:
+    page = doc[page_idx]
+    h = hashlib.sha256(f"{OCR_VERSION}|{OCR_DPI}|{OCR_LANG}|{page.rotation}".encode())
+    h.update(page.read_contents())
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.hexdigest()
+
+
+# ---------------------------------------------------
+# Cache
+# ---------------------------------------------------
+def _cache_path(key: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _load_cached(key: str) -> Optional[list]:
+    try:
+        with open(_cache_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _store(key: str, tables: list) -> None:
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tables, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------
+# OCR worker
+# ---------------------------------------------------
+def _open(source):
+    if isinstance(source, (bytes, bytearray)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    return pymupdf.open(source)
+
+
+def _rasterize(source, page_idx: int) -> np.ndarray:
+    doc = _open(source)
+    try:
+        pix = doc[page_idx].get_pixmap(dpi=OCR_DPI, colorspace=pymupdf.csGRAY)
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    finally:
+        doc.close()
+    # Otsu binarisation removes scan noise / background tint
+    _, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return img
+
+
+def _lines_to_table(data: Dict[str, list]) -> List[List[str]]:
+    """Tesseract word boxes -> rows of cells."""
+    lines: Dict[Tuple[int, int, int], list] = {}
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(
+            (data["left"][i], data["left"][i] + data["width"][i], data["height"][i], text)
+        )
+
+    rows = []
+    for words in lines.values():  # --psm 6: one block, lines top to bottom
+        words.sort()
+        gap = _CELL_GAP * max(h for _, _, h, _ in words)
+        cells = [words[0][3]]
+        for (_, prev_right, _, _), (left, _, _, text) in zip(words, words[1:]):
+            if left - prev_right > gap:
+                cells.append(text)
+            else:
+                cells[-1] += " " + text
+        rows.append(cells)
+
+    # keep the tabular part: header = first line with 2+ cells
+    start = next((i for i, r in enumerate(rows) if len(r) > 1), None)
+    if start is None:
+        return []
+    return [r for r in rows[start:] if len(r) > 1]
+
+
+def _ocr_page(args) -> Tuple[int, Optional[list]]:
+    """Worker entry point. Returns (page_idx, tables) or (page_idx, None) on failure."""
+    source, page_idx = args
+    try:
+        img = _rasterize(source, page_idx)
+        data = pytesseract.image_to_data(
+            img, lang=OCR_LANG, config="--psm 6", output_type=pytesseract.Output.DICT
+        )
+    except Exception as e:
+        print(f"⚠️ OCR failed on page {page_idx + 1}: {e}", flush=True)
+        return page_idx, None
+    table = _lines_to_table(data)
+    return page_idx, [table] if table else []
+
+
+# ---------------------------------------------------
+# Entry point
+# ---------------------------------------------------
+def ocr_page_tables(
+    source, doc, page_indexes: Sequence[int], workers: Optional[int] = None
+) -> List[Tuple[int, list]]:
+    """
+    OCR the given (text-less) pages of an open PyMuPDF doc.
+    source is what the workers re-open: a path, or the PDF bytes.
+    workers: OCR processes (default: OCR_WORKERS; 1 = in this process).
+    """
+    results: Dict[int, list] = {}
+    misses: Dict[str, List[int]] = {}  # key -> pages (identical scans OCR once)
+    for page_idx in page_indexes:
+        key = page_key(doc, page_idx)
+        cached = _load_cached(key)
+        if cached is None:
+            misses.setdefault(key, []).append(page_idx)
+        else:
+            results[page_idx] = cached
+
+    if misses:
+        print(f"🔍 OCR: {len(misses)} page(s), {len(results)} from cache", flush=True)
+        if workers is None:
+            workers = OCR_WORKERS
+        workers = max(1, min(workers, len(misses)))
+        tasks = [(source, pages[0]) for pages in misses.values()]
+
+        if workers == 1:
+            done = map(_ocr_page, tasks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            done = pool.map(_ocr_page, tasks)
+        try:
+            for key, (_, tables) in zip(misses, done):
+                if tables is None:
+                    continue  # failed: don't cache, retry next time
+                _store(key, tables)
+                for page_idx in misses[key]:
+                    results[page_idx] = tables
+        finally:
+            if workers > 1:
+                pool.shutdown()
+
+    return [(i, results[i]) for i in page_indexes if i in results]
@@ -0,0 +1,230 @@
+# pipeline_metrics.py
+"""
+Lightweight per-stage instrumentation for Stage 1 / Stage 2.
+
+    @pipeline_metrics.run("stage1")            # one pipeline run
+    def run_stage1(...):
+        with pipeline_metrics.stage("upsert") as st:
+            st.count(records)
+            upsert_part_master(records)
+
+    @pipeline_metrics.timed()                  # a stage per call
+    def basic_cleaning(df): ...
+
+Every finished stage is one JSON line appended to METRICS_PATH: wall and
+CPU seconds (this process only, not pool workers), output rows / columns,
+the process's peak RSS and how much the stage raised it, and with
+METRICS_TRACEMALLOC=1 the traced-allocation peak above the stage's
+starting point. When the run ends, a summary table aggregated by stage
+name is printed.
+
+Outside a run (e.g. in pool worker processes) stages record nothing.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from config import METRICS_PATH, METRICS_TRACEMALLOC
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Stage:
+    """Measurements of one stage() block; record its output via frame()/count()."""
+
+    def __init__(self, name: str, depth: int, seq: int):
+        self.name = name
+        self.depth = depth
+        self.seq = seq
+        self.rows: Optional[int] = None
+        self.cols: Optional[int] = None
+        self.child_peak = 0  # highest tracemalloc peak seen by nested stages
+
+    def frame(self, df):
+        if isinstance(df, pd.DataFrame):
+            self.rows, self.cols = df.shape
+        return df
+
+    def count(self, items):
+        self.rows = len(items)
+        return items
+
+
+# active run: {"name", "id", "records", "stack", "seq"}; None outside run()
+_run: Optional[Dict[str, Any]] = None
+
+
+def _max_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Stage]:
+    if _run is None:
+        yield Stage(name, 0, 0)
+        return
+
+    stack: List[Stage] = _run["stack"]
+    parent = stack[-1] if stack else None
+    st = Stage(name, len(stack), _run["seq"])
+    _run["seq"] += 1
+    stack.append(st)
+
+    traced0 = None
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent.child_peak = max(parent.child_peak, peak)
+        tracemalloc.reset_peak()
+        traced0 = current
+    rss0 = _max_rss_mb()
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    ok = False
+    try:
+        yield st
+        ok = True
+    finally:
+        rec = {
+            "run": _run["id"],
+            "stage": name,
+            "seq": st.seq,
+            "depth": st.depth,
+            "ok": ok,
+            "wall_s": round(time.perf_counter() - wall0, 4),
+            "cpu_s": round(time.process_time() - cpu0, 4),
+            "rows": st.rows,
+            "cols": st.cols,
+        }
+        rss1 = _max_rss_mb()
+        if rss1 is not None:
+            rec["max_rss_mb"] = round(rss1, 1)
+            rec["rss_growth_mb"] = round(rss1 - rss0, 1)
+        if traced0 is not None:
+            peak = max(tracemalloc.get_traced_memory()[1], st.child_peak)
+            rec["traced_peak_mb"] = round((peak - traced0) / 2**20, 1)
+            if parent is not None:
+                parent.child_peak = max(parent.child_peak, peak)
+        stack.pop()
+        _run["records"].append(rec)
+
+
+def timed(name: Optional[str] = None):
+    """Decorator: each call is a stage (DataFrame results give rows/cols)."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(label) as st:
+                out = fn(*args, **kwargs)
+                if isinstance(out, pd.DataFrame):
+                    st.frame(out)
+                elif isinstance(out, list):
+                    st.count(out)
+                return out
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def run(name: str) -> Iterator[Stage]:
+    """
+    One pipeline run; works as a decorator too. On exit (also on errors)
+    writes the JSON lines and prints the summary. A run started inside
+    another run is just a stage of it.
+    """
+    global _run
+    if _run is not None:
+        with stage(name) as st:
+            yield st
+        return
+
+    tracing = METRICS_TRACEMALLOC and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    _run = {
+        "name": name,
+        "id": f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        "records": [],
+        "stack": [],
+        "seq": 0,
+    }
+    try:
+        with stage(name) as st:
+            yield st
+    finally:
+        finished, _run = _run, None
+        if tracing:
+            tracemalloc.stop()
+        records = sorted(finished["records"], key=lambda r: r["seq"])
+        _write(records)
+        print_summary(finished["name"], records)
+
+
+def _write(records: List[Dict[str, Any]]) -> None:
+    if not METRICS_PATH:
+        return
+    try:
+        os.makedirs(os.path.dirname(METRICS_PATH) or ".", exist_ok=True)
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps({"ts": ts, **rec}) + "\n")
+    except OSError as e:
+        print(f"⚠️  Could not write metrics to {METRICS_PATH}: {e}", flush=True)
+
+
+def summarize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Aggregate records by stage name, in first-seen order."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for rec in records:
+        agg = rows.setdefault(rec["stage"], {
+            "stage": rec["stage"], "depth": rec["depth"], "calls": 0,
+            "wall_s": 0.0, "cpu_s": 0.0, "rows": None, "cols": None,
+            "max_rss_mb": None, "traced_peak_mb": None,
+        })
+        agg["depth"] = min(agg["depth"], rec["depth"])
+        agg["calls"] += 1
+        agg["wall_s"] += rec["wall_s"]
+        agg["cpu_s"] += rec["cpu_s"]
+        if rec["rows"] is not None:
+            agg["rows"] = (agg["rows"] or 0) + rec["rows"]
+        for key in ("cols", "max_rss_mb", "traced_peak_mb"):
+            if rec.get(key) is not None:
+                agg[key] = max(agg[key] or 0, rec[key])
+    return list(rows.values())
+
+
+def print_summary(name: str, records: List[Dict[str, Any]]) -> None:
+    def fmt(v, spec, width):
+        return format(v, spec).rjust(width) if v is not None else "-".rjust(width)
+
+    print(f"⏱️  {name} stage summary", flush=True)
+    print(
+        f"   {'stage':34s} {'calls':>5s} {'wall s':>8s} {'cpu s':>8s} "
+        f"{'rows':>10s} {'cols':>5s} {'rss MB':>8s} {'traced MB':>9s}",
+        flush=True,
+    )
+    for agg in summarize(records):
+        label = ("  " * agg["depth"] + agg["stage"])[:34]
+        print(
+            f"   {label:34s} {agg['calls']:5d} {agg['wall_s']:8.2f} {agg['cpu_s']:8.2f} "
+            f"{fmt(agg['rows'], ',d', 10)} {fmt(agg['cols'], 'd', 5)} "
+            f"{fmt(agg['max_rss_mb'], '.1f', 8)} {fmt(agg['traced_peak_mb'], '.1f', 9)}",
+            flush=True,
+        )
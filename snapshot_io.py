@@ -0,0 +1,102 @@
+# snapshot_io.py
+"""
+Snapshot / intermediate files for every stage.
+
+- Parquet is the primary format: fast to write, compact, columnar, and
+  readable column-by-column (read_snapshot(columns=...)) with the file
+  memory-mapped instead of copied into RAM.
+- Excel is an optional, on-demand export (export_excel / excel_bytes).
+"""
+
+import io
+import os
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+from pandas.api.types import infer_dtype
+
+# inferred object-column types pyarrow stores as-is
+_ARROW_OK = {"string", "empty", "boolean", "integer", "floating", "datetime", "date", "bytes"}
+
+
+def to_arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet needs one type per column; merged records can mix e.g. DB
+    datetimes with uploaded strings. Such columns are stored as text.
+    """
+    out = df
+    for col in df.columns:
+        s = df[col]
+        if s.dtype != object or infer_dtype(s, skipna=True) in _ARROW_OK:
+            continue
+        if out is df:
+            out = df.copy()
+        out[col] = s.where(s.isna(), s.astype(str))
+    if any(not isinstance(c, str) for c in out.columns):
+        out = out.rename(columns=str)
+    return out
+
+
+def write_snapshot(df: pd.DataFrame, path: str) -> str:
+    """Write df as Parquet (atomically) and return the path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    to_arrow_safe(df).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def snapshot_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    to_arrow_safe(df).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def read_snapshot(source, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Read a Parquet snapshot (path or bytes). Paths are memory-mapped;
+    pass columns to decode only those (an empty list reads none).
+    """
+    columns = None if columns is None else list(columns)
+    if isinstance(source, (bytes, bytearray)):
+        return pd.read_parquet(io.BytesIO(source), columns=columns)
+    return pd.read_parquet(source, columns=columns, memory_map=True)
+
+
+def snapshot_columns(path: str) -> List[str]:
+    """Column names from the Parquet footer, without reading any data."""
+    return pq.read_schema(path).names
+
+
+def _excel_ready(df: pd.DataFrame) -> pd.DataFrame:
+    df = to_arrow_safe(df)
+    # Excel cannot handle tz-aware datetimes
+    tz_cols = list(df.select_dtypes(include=["datetimetz"]).columns)
+    if not tz_cols:
+        return df
+    df = df.copy()
+    for col in tz_cols:
+        df[col] = df[col].dt.tz_localize(None)
+    return df
+
+
+def export_excel(df: pd.DataFrame, path_or_buffer, sheet_name: str = "Sheet1", autofit: bool = True):
+    """On-demand Excel export (xlsxwriter), optionally with fitted column widths."""
+    df = _excel_ready(df)
+    with pd.ExcelWriter(path_or_buffer, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        if not autofit:
+            return path_or_buffer
+        ws = writer.sheets[sheet_name]
+        for i, col in enumerate(df.columns):
+            longest = df[col].astype(str).str.len().max() if len(df) else 0
+            width = max(longest, len(str(col))) + 2
+            ws.set_column(i, i, min(width, 60))
+    return path_or_buffer
+
+
+def excel_bytes(df: pd.DataFrame, sheet_name: str = "Sheet1", autofit: bool = True) -> bytes:
+    buffer = io.BytesIO()
+    export_excel(df, buffer, sheet_name=sheet_name, autofit=autofit)
+    return buffer.getvalue()
@@ -0,0 +1,60 @@
+# stage1_manifest.py
+"""
+Which part_numbers each Stage 1 source file contributed, as of the last
+successful run. Used by incremental Stage 1 to re-merge only the parts
+touched by new / changed / removed files.
+
+Layout of output/stage1_manifest.json:
+{
+  "files": {
+    "<system>/<fname>": {"key": "<ingestion cache key>", "part_numbers": [...]},
+    ...
+  }
+}
+"""
+
+import json
+import os
+from typing import Dict, List
+
+import pandas as pd
+
+from config import OUTPUT_DIR
+
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "stage1_manifest.json")
+
+
+def file_id(system: str, fname: str) -> str:
+    return f"{system}/{fname}"
+
+
+def load_manifest() -> Dict[str, Dict]:
+    """files section of the manifest ({} if there is none yet)."""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable manifest {MANIFEST_PATH}: {e}", flush=True)
+        return {}
+
+
+def save_manifest(files: Dict[str, Dict]) -> None:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"files": files}, f, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def part_numbers_by_file(df_clean: pd.DataFrame) -> Dict[str, List[str]]:
+    """{file_id: sorted part_numbers} for a cleaned, tagged frame."""
+    if df_clean.empty:
+        return {}
+    pns = df_clean[["source_system", "source_file", "part_number"]].dropna()
+    pns = pns[pns["part_number"].astype(str) != ""]
+    out = {}
+    for (system, fname), g in pns.groupby(["source_system", "source_file"], sort=False, observed=True):
+        out[file_id(system, fname)] = sorted(g["part_number"].astype(str).unique())
+    return out
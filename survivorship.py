@@ -0,0 +1,223 @@
+# survivorship.py
+"""
+Field-level survivorship: which row's value a merged part keeps, per
+field, from the declarative rules in survivorship_config.py.
+
+compile_rules() turns the rules into a Plan. Every rule is a per-row
+score (source rank, date, text length, how often the part's rows repeat
+the value; 0 for "last"), and a field's winner is its non-missing row
+with the highest (score, row position). Ties and unranked rows therefore
+go to the later row, like the plain "last row wins" overwrite.
+
+- GroupedRows.winners: vectorized, for a frame sorted by part - one
+  maximum.reduceat per column over score * rows + position (source
+  ranks / dates are computed once per frame, not per column)
+- PartFold: the same decision one row at a time, for the streaming
+  Stage 1 merge and the per-part Stage 2 merges
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from column_utils import map_distinct
+from mapping_engine import PRIORITY
+from survivorship_config import DEFAULT_RULE, SOURCE_ALIASES, SURVIVORSHIP_RULES
+
+RULES = ("last", "priority", "most_recent", "most_frequent", "longest")
+
+
+class Rule(NamedTuple):
+    kind: str
+    ranks: Tuple[Tuple[str, int], ...] = ()  # priority: (source, rank), higher wins, unlisted = 0
+    by: Optional[str] = None                 # most_recent: date column
+
+
+def _compile_rule(field: str, spec: Dict[str, Any]) -> Rule:
+    kind = spec.get("rule", "last")
+    if kind not in RULES:
+        raise ValueError(f"Unknown survivorship rule {kind!r} for {field!r} (expected one of {RULES})")
+    if kind == "priority":
+        sources = list(spec.get("sources") or reversed(PRIORITY))
+        ranks = {s: len(sources) - i for i, s in enumerate(sources)}
+        for alias, source in SOURCE_ALIASES.items():
+            if source in ranks:
+                ranks.setdefault(alias, ranks[source])
+        return Rule(kind, ranks=tuple(ranks.items()))
+    if kind == "most_recent":
+        if not spec.get("by"):
+            raise ValueError(f"most_recent rule for {field!r} needs a 'by' date column")
+        return Rule(kind, by=spec["by"])
+    return Rule(kind)
+
+
+class Plan:
+    def __init__(self, rules: Dict[str, Rule], default: Rule):
+        self.rules = rules
+        self.default = default
+        self._ranks = {r.ranks: dict(r.ranks) for r in [default, *rules.values()]}
+
+    def rule(self, field: str) -> Rule:
+        return self.rules.get(field, self.default)
+
+    def rank(self, rule: Rule, source: Any) -> int:
+        try:
+            return self._ranks[rule.ranks].get(source, 0)
+        except TypeError:  # unhashable source value
+            return 0
+
+
+def compile_rules(
+    rules: Dict[str, Dict[str, Any]] = SURVIVORSHIP_RULES,
+    default: Dict[str, Any] = DEFAULT_RULE,
+) -> Plan:
+    return Plan({f: _compile_rule(f, spec) for f, spec in rules.items()}, _compile_rule("*", default))
+
+
+PLAN = compile_rules()
+LAST_WINS = compile_rules({})  # the plain overwrite
+
+
+def _timestamp(v: Any) -> float:
+    """Sortable time of a date cell (ns since epoch); -inf when missing / unparseable."""
+    if v is None:
+        return -math.inf
+    if isinstance(v, str):
+        return _parse_date(v)
+    return _parse_date.__wrapped__(v)
+
+
+@lru_cache(maxsize=65536)
+def _parse_date(v: Any) -> float:
+    try:
+        ts = pd.to_datetime(v, errors="coerce")
+    except (TypeError, ValueError, OverflowError):
+        return -math.inf
+    return -math.inf if pd.isna(ts) else float(ts.value)
+
+
+# ---------------------------------------------------
+# Vectorized
+# ---------------------------------------------------
+class GroupedRows:
+    """
+    A frame's rows grouped by part: order = df positions sorted by part
+    (source order kept within a part), starts = each part's first sorted row.
+    """
+
+    def __init__(self, df: pd.DataFrame, order: np.ndarray, starts: np.ndarray, plan: Plan = PLAN):
+        self.df = df
+        self.order = order
+        self.starts = starts
+        self.plan = plan
+        self.group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+        self.pos = np.arange(len(order), dtype=np.int64)
+        self._shared: Dict[Any, np.ndarray] = {}  # source ranks / date ranks, per rule
+
+    def winners(self, label: Any, col: pd.Series, present: np.ndarray) -> np.ndarray:
+        """
+        Sorted position of each part's winning row for column label, -1
+        where none of its rows has a value; present is the sorted rows'
+        non-missing mask.
+        """
+        rule = self.plan.rule(label)
+        m = len(self.order)
+        if rule.kind == "last":
+            key = self.pos
+        else:
+            key = self._score(rule, col, present) * m + self.pos
+        best = np.maximum.reduceat(np.where(present, key, -1), self.starts)
+        return np.where(best >= 0, best % m, -1)
+
+    def _score(self, rule: Rule, col: pd.Series, present: np.ndarray) -> np.ndarray:
+        if rule.kind == "priority":
+            return self._shared_score(rule, "source_system", lambda s: self.plan.rank(rule, s))
+        if rule.kind == "most_recent":
+            return self._shared_score(rule, rule.by, _timestamp)
+        if rule.kind == "longest":
+            return map_distinct(col, lambda v: len(str(v)), 0)[self.order].astype(np.int64)
+        # most_frequent: rows of the part holding the same value (missing ones excluded)
+        codes = pd.factorize(col)[0][self.order]
+        pairs = self.group[present] * (codes.max() + 2) + codes[present]
+        _, inverse, counts = np.unique(pairs, return_inverse=True, return_counts=True)
+        score = np.zeros(len(self.order), dtype=np.int64)
+        score[present] = counts[inverse]
+        return score
+
+    def _shared_score(self, rule: Rule, column: str, fn: Callable[[Any], Any]) -> np.ndarray:
+        """fn of a per-row column as dense int ranks (order kept), cached per rule."""
+        if rule not in self._shared:
+            col = self.df.get(column)
+            if col is None:
+                self._shared[rule] = np.zeros(len(self.order), dtype=np.int64)
+            else:
+                raw = map_distinct(col, fn, fn(None))[self.order].astype(np.float64)
+                self._shared[rule] = np.unique(raw, return_inverse=True)[1].astype(np.int64).ravel()
+        return self._shared[rule]
+
+
+# ---------------------------------------------------
+# Row by row
+# ---------------------------------------------------
+class PartFold:
+    """
+    One part's running merge: add() rows in order, read .values (keys in
+    the order rows first filled them).
+    """
+
+    __slots__ = ("plan", "values", "_scores", "_counts", "_rows")
+
+    def __init__(self, plan: Plan = PLAN, values: Optional[Dict[str, Any]] = None):
+        self.plan = plan
+        self.values: Dict[str, Any] = {} if values is None else values
+        self._scores: Dict[str, Any] = {}
+        self._counts: Dict[str, Dict[Any, int]] = {}
+        self._rows = 0
+
+    def add(
+        self,
+        row: Dict[str, Any],
+        missing: Callable[[Any], bool],
+        keys: Optional[Iterable[str]] = None,
+        skip: Iterable[str] = (),
+        source: Any = None,
+    ) -> None:
+        """
+        Offer row's non-missing values (only keys, when given). source is
+        what priority rules rank (default: the row's source_system).
+        """
+        if source is None:
+            source = row.get("source_system")
+        self._rows += 1
+        for k in row if keys is None else keys:
+            if k in skip or k not in row:
+                continue
+            v = row[k]
+            if missing(v):
+                continue
+            rule = self.plan.rule(k)
+            if rule.kind == "last":
+                self.values[k] = v
+                continue
+            score = self._score(rule, k, v, row, source)
+            if k not in self._scores or score >= self._scores[k]:
+                self.values[k] = v
+                self._scores[k] = score
+
+    def _score(self, rule: Rule, k: str, v: Any, row: Dict[str, Any], source: Any) -> Any:
+        if rule.kind == "priority":
+            return self.plan.rank(rule, source)
+        if rule.kind == "most_recent":
+            return _timestamp(row.get(rule.by))
+        if rule.kind == "longest":
+            return len(str(v))
+        # most_frequent: only v's count changed, so v wins on reaching the best count
+        counts = self._counts.setdefault(k, {})
+        try:
+            counts[v] = counts.get(v, 0) + 1
+            return counts[v]
+        except TypeError:  # unhashable: counts once
+            return 1
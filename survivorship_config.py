@@ -0,0 +1,35 @@
+# survivorship_config.py
+
+# Which value a merged part keeps when several of its rows have one
+# (Stage 1 source rows; Stage 2 DB row + user uploads). See survivorship.py.
+#
+#   {"rule": "last"}                      the last row in source order
+#   {"rule": "priority"}                  the row from the highest-priority
+#                                         source; "sources": [...] lists them
+#                                         highest first (default:
+#                                         mapping_engine.PRIORITY)
+#   {"rule": "most_recent", "by": col}    the row with the latest date in col
+#   {"rule": "most_frequent"}             the value most rows agree on
+#   {"rule": "longest"}                   the longest text
+#
+# Ties, and rows from sources a priority rule doesn't list, go to the
+# later row. Missing values never win.
+
+DEFAULT_RULE = {"rule": "last"}
+
+SURVIVORSHIP_RULES = {
+    # ---- canonical fields (mapping_engine.FIELD_MAP) ----
+    "description": {"rule": "priority"},
+    "material": {"rule": "priority"},
+    "dimensions": {"rule": "priority"},
+    "category_raw": {"rule": "priority"},
+    "cost": {"rule": "priority"},
+    "currency": {"rule": "priority"},
+    "vendor_name": {"rule": "priority"},
+}
+
+# source_system values that rank as another source (Stage 2 uploads are
+# tagged "user", PRIORITY calls them "user_upload").
+SOURCE_ALIASES = {
+    "user": "user_upload",
+}
@@ -1,26 +1,26 @@
 # taxonomy_ui/stage2_adapter.py
 
-import io
 import pandas as pd
-from django.conf import settings
 
 from ingestion_utils import load_file
-from cleansing import cleanup_pipeline
+from cleansing import cleanup_pipeline, to_categoricals
 from enrichment_text import enrich_from_description
 from merge_logic import merge_db_with_user
 from db import fetch_part_by_number, upsert_part_master
+from snapshot_io import snapshot_bytes
 
 
 def run_stage2_from_django(uploaded_files):
     """
-    Accepts a list of Django InMemoryUploadedFile objects,
-    converts each to a DataFrame, runs full Stage-2 cleansing + merge,
-    and returns (excel_bytes, filename).
+    Accepts a list of Django uploaded files (spooled to disk by
+    TemporaryFileUploadHandler), converts each to a DataFrame, runs full Stage-2 cleansing + merge,
+    and returns (parquet_bytes, filename).
+    Excel is produced on demand by the download views.
     """
     dfs = []
 
     for f in uploaded_files:
-        # Read file directly from Django uploaded file
+        # Parsed from the upload's temp file, not an in-memory copy
         df = load_file(f)
         if df is None or df.empty:
             continue
@@ -35,9 +35,10 @@ def run_stage2_from_django(uploaded_files):
     # Combine all user data
     df_raw = pd.concat(dfs, ignore_index=True)
 
-    # Cleanup + enrichment
-    df_clean = cleanup_pipeline(df_raw)
-    df_clean = enrich_from_description(df_clean)
+    # Cleanup + enrichment (in place: df_raw is not used afterwards)
+    df_clean = cleanup_pipeline(df_raw, inplace=True)
+    df_clean = enrich_from_description(df_clean, inplace=True)
+    df_clean = to_categoricals(df_clean, inplace=True)
 
     df_clean = df_clean[df_clean["part_number"].notna()].copy()
     df_clean["part_number"] = df_clean["part_number"].astype(str).str.strip()
@@ -61,17 +62,6 @@ def run_stage2_from_django(uploaded_files):
     # Upsert merged results into DB
     upsert_part_master(merged_results)
 
-    # Prepare Excel output
-    output_buffer = io.BytesIO()
+    # Columnar output; Excel export happens only when downloaded
     df_out = pd.DataFrame(merged_results)
-
-    # 🔥 FIX: Remove timezone info (Excel cannot handle tz-aware datetimes)
-    for col in df_out.select_dtypes(include=["datetimetz"]):
-        df_out[col] = df_out[col].dt.tz_localize(None)
-
-    with pd.ExcelWriter(output_buffer, engine="xlsxwriter") as writer:
-        df_out.to_excel(writer, index=False, sheet_name="Parts")
-
-    output_buffer.seek(0)
-
-    return output_buffer.getvalue(), "user_output.xlsx"
+    return snapshot_bytes(df_out), "user_output.parquet"
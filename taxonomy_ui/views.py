@@ -1,7 +1,6 @@
 # taxonomy_ui/views.py
 
 import os
-import io
 import sys
 import subprocess
 from collections import defaultdict
@@ -15,6 +14,7 @@ from django.utils import timezone
 
 from .models import PartMaster
 from taxonomy_ui.stage2_adapter import run_stage2_from_django
+from snapshot_io import excel_bytes, read_snapshot, snapshot_columns
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -163,8 +163,8 @@ def upload_and_process(request):
         output_filename = filename
 
         # Load preview DataFrame
-        print("📊 Loading Excel data...", flush=True)
-        df = pd.read_excel(io.BytesIO(output_bytes))
+        print("📊 Loading output data...", flush=True)
+        df = read_snapshot(output_bytes)
         print(f"✅ Loaded DataFrame: {len(df)} rows, {len(df.columns)} columns", flush=True)
         print(f"   Columns: {list(df.columns)[:10]}...", flush=True)  # Show first 10 columns
 
@@ -269,20 +269,28 @@ def upload_and_process(request):
 # ----------------------------------------------------------
 # FULL OUTPUT DOWNLOAD
 # ----------------------------------------------------------
+def _excel_name(filename):
+    return os.path.splitext(filename)[0] + ".xlsx"
+
+
 def download_full_output(request, filename):
     output_path = os.path.join(settings.MEDIA_ROOT, "output", filename)
 
     if not os.path.exists(output_path):
         return HttpResponse("File not found.", status=404)
 
-    with open(output_path, "rb") as f:
-        data = f.read()
+    if filename.endswith(".parquet"):
+        # Excel is only built when someone actually downloads it
+        data = excel_bytes(read_snapshot(output_path), sheet_name="Parts", autofit=False)
+    else:
+        with open(output_path, "rb") as f:
+            data = f.read()
 
     response = HttpResponse(
         data,
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Content-Disposition"] = f'attachment; filename="{_excel_name(filename)}"'
     return response
 
 
@@ -304,21 +312,25 @@ def download_selected_columns(request):
     if not os.path.exists(output_path):
         return HttpResponse("Output file not found.", status=404)
 
-    df = pd.read_excel(output_path)
-
-    if selected_columns:
-        df = df[[c for c in selected_columns if c in df.columns]]
-
-    buffer = io.BytesIO()
-    df.to_excel(buffer, index=False)
-    buffer.seek(0)
+    if output_filename.endswith(".parquet"):
+        # columnar: decode only the requested columns (none of them
+        # existing exports no columns, as with Excel below)
+        columns = None
+        if selected_columns:
+            available = snapshot_columns(output_path)
+            columns = [c for c in selected_columns if c in available]
+        df = read_snapshot(output_path, columns=columns)
+    else:
+        df = pd.read_excel(output_path)
+        if selected_columns:
+            df = df[[c for c in selected_columns if c in df.columns]]
 
     response = HttpResponse(
-        buffer.getvalue(),
+        excel_bytes(df, autofit=False),
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
     response["Content-Disposition"] = (
-        f'attachment; filename="selected_{output_filename}"'
+        f'attachment; filename="selected_{_excel_name(output_filename)}"'
     )
     return response
 
@@ -0,0 +1,15 @@
+# tests/test_cleansing.py
+"""Cleansing steps on frames straight from the loaders."""
+
+import pandas as pd
+
+from cleansing import ensure_dimensions
+
+
+def test_ensure_dimensions_with_duplicate_index():
+    df = pd.DataFrame(
+        {"description": ["Plate 10x20", "Bolt", "Shim 3 x 4 cm"], "dimensions": [None, "", None]},
+        index=[0, 0, 1],
+    )
+    out = ensure_dimensions(df)
+    assert out["dimensions"].tolist() == ["10x20 mm", None, "3x4 cm"]
@@ -0,0 +1,31 @@
+# tests/test_cleanup_memory.py
+"""
+In-place cleanup_pipeline + enrich_from_description must peak at most
+~2x the input frame (tracemalloc; numpy buffers and strings are traced).
+benchmarks/bench_cleanup_memory.py times the same frames.
+"""
+
+import tracemalloc
+
+from benchmarks.bench_cleanup_memory import synthetic_source
+from cleansing import cleanup_pipeline
+from enrichment_text import enrich_from_description
+
+MAX_RATIO = 2.0
+
+
+def test_inplace_cleanup_peak_within_2x_input():
+    tracemalloc.start()
+    try:
+        df = synthetic_source(50_000, 60)
+        size = tracemalloc.get_traced_memory()[0]
+
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        out = enrich_from_description(cleanup_pipeline(df, inplace=True), inplace=True)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    assert not out.empty
+    assert peak <= MAX_RATIO * size, f"peak {peak / 2**20:.1f} MB is {peak / size:.2f}x the {size / 2**20:.1f} MB input"
@@ -0,0 +1,33 @@
+# tests/test_stage1_incremental.py
+"""Incremental Stage 1: a file that fails to load is retried on the next run."""
+
+import background_stage1
+import stage1_manifest
+
+
+def test_failed_file_is_retried(tmp_path, monkeypatch):
+    for system, text in [("sap", "part_number,description\nP1,Bolt\n"), ("vault", "part_number,description\nP2,Nut\n")]:
+        (tmp_path / system).mkdir()
+        (tmp_path / system / f"{system}.csv").write_text(text)
+    monkeypatch.setattr(background_stage1, "SOURCES_DIRS", {s: str(tmp_path / s) for s in ("sap", "vault")})
+    monkeypatch.setattr(stage1_manifest, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(stage1_manifest, "MANIFEST_PATH", str(tmp_path / "stage1_manifest.json"))
+
+    load = background_stage1._load_source_file
+
+    def fail_vault(task):
+        if task[0] == "vault":
+            raise OSError("locked")
+        return load(task)
+
+    monkeypatch.setattr(background_stage1, "_load_source_file", fail_vault)
+    merged, affected, manifest = background_stage1._merge_incremental(workers=1, use_cache=False)
+    assert [r["part_number"] for r in merged] == ["P1"]
+    assert manifest["vault/vault.csv"]["key"] is None
+    stage1_manifest.save_manifest(manifest)
+
+    monkeypatch.setattr(background_stage1, "_load_source_file", load)
+    merged, affected, manifest = background_stage1._merge_incremental(workers=1, use_cache=False)
+    assert [r["part_number"] for r in merged] == ["P2"]
+    assert affected == {"P2"}
+    assert manifest["vault/vault.csv"]["part_numbers"] == ["P2"]
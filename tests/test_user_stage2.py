@@ -0,0 +1,29 @@
+# tests/test_user_stage2.py
+"""Stage 2 CLI merge: empty user cells must not overwrite DB values."""
+
+import math
+
+import pandas as pd
+
+from cleansing import to_categoricals
+from user_stage2 import merge_db_and_user
+
+
+def test_empty_categorical_cells_keep_db_values():
+    db_row = {"part_number": "P1", "vendor_name": "DBVENDOR", "plant": "1000", "description": "old", "sources": "[]"}
+    user = pd.DataFrame({
+        "part_number": ["P1", "P2"],
+        "vendor_name": [None, "ACME"],
+        "plant": [None, "2000"],
+        "description": ["new", "other"],
+        "source_system": ["user", "user"],
+        "source_file": ["upload.xlsx", "upload.xlsx"],
+    })
+    rows = to_categoricals(user).to_dict(orient="records")
+    assert isinstance(rows[0]["vendor_name"], float) and math.isnan(rows[0]["vendor_name"])
+
+    merged = merge_db_and_user(db_row, rows[:1])
+
+    assert merged["vendor_name"] == "DBVENDOR"
+    assert merged["plant"] == "1000"
+    assert merged["description"] == "new"
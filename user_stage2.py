@@ -13,16 +13,21 @@ Stage 2 (FINAL FIXED VERSION - TOP NOTCH):
 
 import os
 import json
+import argparse
 import pandas as pd
 from collections import defaultdict
 
-from config import USER_UPLOAD_DIR, OUTPUT_DIR
+import pipeline_metrics
+from config import USER_UPLOAD_DIR, OUTPUT_DIR, SNAPSHOT_EXCEL
 from ingestion_utils import load_file
-from cleansing import cleanup_pipeline
-from enrichment_text import enrich_from_description
+from cleansing import cleanup_pipeline_parallel, to_categoricals
 from db import fetch_part_by_number, upsert_part_master
+from merge_logic import DB_SOURCE, _is_missing
+from survivorship import PLAN, PartFold
+from snapshot_io import export_excel, write_snapshot
 
 
+@pipeline_metrics.timed()
 def load_user_files():
     dfs = []
     if not os.path.isdir(USER_UPLOAD_DIR):
@@ -43,30 +48,31 @@ def load_user_files():
     return pd.concat(dfs, ignore_index=True)
 
 
+@pipeline_metrics.timed()
 def clean_pipeline(df: pd.DataFrame) -> pd.DataFrame:
-    df = cleanup_pipeline(df)
-    df = enrich_from_description(df)
-    return df
+    """Cleanse + enrich (chunk-parallel when large); df is handed over."""
+    df = cleanup_pipeline_parallel(df, enrich=True)
+    return to_categoricals(df, inplace=True)
 
 
 def merge_db_and_user(db_row: dict, user_rows: list) -> dict:
     """
     FINAL FIXED MERGE:
     - start with FULL DB ROW
-    - apply USER values on top
+    - apply USER values on top (missing ones - None, blank, NaN from
+      categorical columns, "nan" / "null" - never override)
     - keep all DB fields ALWAYS
     """
-    if db_row is None:
-        # new part: combine all user rows
-        base = {}
-    else:
-        base = db_row.copy()
-
-    # merge ALL user rows (last user row wins)
+    # new part (no DB row): combine all user rows
+    base = {} if db_row is None else db_row.copy()
+    fold = PartFold(PLAN, base)
+    if db_row is not None:
+        fold.add(db_row, _is_missing, source=DB_SOURCE)
+
+    # merge ALL user rows by the survivorship rules (last user row wins
+    # under "last" / "priority")
     for u in user_rows:
-        for k, v in u.items():
-            if v not in [None, "", "nan", "NaN"]:
-                base[k] = v
+        fold.add(u, _is_missing)
 
     # Ensure sources is a list
     old_sources = []
@@ -91,17 +97,11 @@ def merge_db_and_user(db_row: dict, user_rows: list) -> dict:
 
 
 def autofit_excel(path: str, df: pd.DataFrame):
-    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Sheet1")
-        ws = writer.sheets["Sheet1"]
-
-        for i, col in enumerate(df.columns):
-            series = df[col].astype(str)
-            width = max(series.map(len).max(), len(col)) + 2
-            ws.set_column(i, i, min(width, 60))
+    export_excel(df, path, sheet_name="Sheet1", autofit=True)
 
 
-def run_stage2():
+@pipeline_metrics.run("stage2")
+def run_stage2(excel: bool = SNAPSHOT_EXCEL):
     print("📥 Stage 2: Processing user uploads...\n")
 
     df_raw = load_user_files()
@@ -127,14 +127,17 @@ def run_stage2():
 
     merged_results = []
 
-    for pn, user_rows in groups.items():
-        print(f"   🔄 Merging user updates for part_number={pn}")
-        db_row = fetch_part_by_number(pn)
-        merged = merge_db_and_user(db_row, user_rows)
-        merged_results.append(merged)
+    with pipeline_metrics.stage("merge_db_and_user") as st:
+        for pn, user_rows in groups.items():
+            print(f"   🔄 Merging user updates for part_number={pn}")
+            db_row = fetch_part_by_number(pn)
+            merged = merge_db_and_user(db_row, user_rows)
+            merged_results.append(merged)
+        st.count(merged_results)
 
     print(f"\n💾 Upserting {len(merged_results)} rows into DB...")
-    upsert_part_master(merged_results)
+    with pipeline_metrics.stage("upsert") as st:
+        upsert_part_master(st.count(merged_results))
     print("✅ DB updated.")
 
     # Output Excel (sort by part_number)
@@ -145,12 +148,24 @@ def run_stage2():
         key=lambda x: x.str.extract(r'(\d+)', expand=False).fillna(0).astype(int)
     )
 
-    out_path = os.path.join(OUTPUT_DIR, "user_stage2_output.xlsx")
-    autofit_excel(out_path, df_out)
-
+    with pipeline_metrics.stage("write_snapshot") as st:
+        st.frame(df_out)
+        out_path = write_snapshot(df_out, os.path.join(OUTPUT_DIR, "user_stage2_output.parquet"))
     print(f"📂 User output saved to: {out_path}")
+
+    if excel:
+        xlsx_path = os.path.join(OUTPUT_DIR, "user_stage2_output.xlsx")
+        autofit_excel(xlsx_path, df_out)
+        print(f"📂 Excel export saved to: {xlsx_path}")
     print("✅ Stage 2 complete.\n")
 
 
 if __name__ == "__main__":
-    run_stage2()
+    parser = argparse.ArgumentParser(description="Stage 2 user upload processing")
+    parser.add_argument(
+        "--excel",
+        action="store_true",
+        default=SNAPSHOT_EXCEL,
+        help="also export the Parquet output to .xlsx",
+    )
+    run_stage2(excel=parser.parse_args().excel)
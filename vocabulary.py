@@ -0,0 +1,110 @@
+# vocabulary.py
+"""
+Editable vocabularies, loaded from JSON files in VOCAB_DIR instead of
+being hardcoded:
+
+- materials.json        description keyword -> material
+- categories.json       description keyword -> category
+- column_synonyms.json  normalized column name -> canonical column
+
+Each file is {"version": N, "entries": {...}}; entry order matters
+(the first matching keyword wins).
+
+table(name) re-reads a file only when its mtime / size changed, and
+compiled(name, build) keeps build(entries) (a keyword matcher, a regex,
+...) until the file's content hash changes. Django workers and Stage 1
+both pick up edits without a restart and, once warm, pay one os.stat per
+call. A file that goes missing or stops parsing keeps its last good
+version (with a warning); only a process that never read it fails.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+from config import VOCAB_DIR
+
+NAMES = ("materials", "categories", "column_synonyms")
+
+
+class Vocabulary(NamedTuple):
+    stamp: Tuple[int, int]    # (mtime_ns, size) when last read
+    digest: str               # content hash
+    version: Any              # the file's own "version"
+    entries: Dict[str, str]
+
+
+_loaded: Dict[str, Vocabulary] = {}
+# (name, build) -> (digest it was built from, result)
+_compiled: Dict[Tuple[str, Callable], Tuple[str, Any]] = {}
+
+
+def path(name: str) -> str:
+    return os.path.join(VOCAB_DIR, f"{name}.json")
+
+
+def _parse(raw: bytes) -> Tuple[Any, Dict[str, str]]:
+    doc = json.loads(raw)
+    entries = doc["entries"]
+    if not isinstance(entries, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in entries.items()
+    ):
+        raise ValueError('"entries" must map strings to strings')
+    return doc.get("version"), entries
+
+
+def load(name: str) -> Vocabulary:
+    """The current contents of vocabulary `name` (re-read if the file changed)."""
+    p = path(name)
+    cached = _loaded.get(name)
+    try:
+        st = os.stat(p)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if cached is not None and cached.stamp == stamp:
+            return cached
+        with open(p, "rb") as f:
+            raw = f.read()
+    except OSError as e:
+        if cached is None:
+            raise
+        print(f"⚠️  Vocabulary {p} unreadable ({e}); keeping the loaded version", flush=True)
+        return cached
+
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    if cached is not None and cached.digest == digest:
+        vocab = cached._replace(stamp=stamp)  # touched, not changed
+    else:
+        try:
+            version, entries = _parse(raw)
+        except (ValueError, KeyError, TypeError) as e:
+            if cached is None:
+                raise ValueError(f"Invalid vocabulary file {p}: {e}") from e
+            print(f"⚠️  Invalid vocabulary {p} ({e}); keeping the loaded version", flush=True)
+            vocab = cached._replace(stamp=stamp)  # don't re-parse until it changes again
+        else:
+            vocab = Vocabulary(stamp, digest, version, entries)
+            if cached is not None:
+                print(f"🔄 Reloaded vocabulary {name} (version {version}, {len(entries)} entries)", flush=True)
+    _loaded[name] = vocab
+    return vocab
+
+
+def table(name: str) -> Dict[str, str]:
+    """{key: value} of vocabulary `name`; treat as read-only."""
+    return load(name).entries
+
+
+def digest(name: str) -> str:
+    return load(name).digest
+
+
+def compiled(name: str, build: Callable[[Dict[str, str]], Any]) -> Any:
+    """build(table(name)), rebuilt only when the file's content changes."""
+    vocab = load(name)
+    key = (name, build)
+    hit = _compiled.get(key)
+    if hit is None or hit[0] != vocab.digest:
+        hit = (vocab.digest, build(vocab.entries))
+        _compiled[key] = hit
+    return hit[1]